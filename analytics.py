@@ -0,0 +1,142 @@
+# monopoly/analytics.py
+"""
+Landing probabilities and rent expectations for a board, computed with NumPy.
+
+Only the space types decide where tokens end up, so the Markov chain work is
+cached per board layout; everything that depends on prices and owners is a
+cheap vectorized pass on top of it.
+"""
+import functools
+
+import numpy as np
+
+# Probability of each 2d6 total, indexed by total - 2
+DICE_TOTALS = np.arange(2, 13)
+DICE_PROBABILITIES = np.array([1, 2, 3, 4, 5, 6, 5, 4, 3, 2, 1]) / 36
+
+
+def layout_key(board):
+    """The part of a board that decides token movement."""
+    go_to_jail = tuple(i for i, space in enumerate(board.spaces) if space.space_type == "GO_TO_JAIL")
+    return board.size, board.jail_pos, go_to_jail
+
+
+@functools.lru_cache(maxsize=256)
+def _layout_probabilities(size, jail_pos, go_to_jail_positions):
+    # roll[i, j]: chance a roll from i ends on j, before any redirect
+    rows = np.repeat(np.arange(size), len(DICE_TOTALS))
+    cols = (rows + np.tile(DICE_TOTALS, size)) % size
+    roll = np.zeros((size, size))
+    np.add.at(roll, (rows, cols), np.tile(DICE_PROBABILITIES, size))
+
+    # transition[i, j]: chance the token is on j after a turn started on i
+    transition = roll.copy()
+    for pos in go_to_jail_positions:
+        transition[:, jail_pos] += transition[:, pos]
+        transition[:, pos] = 0.0
+
+    # Stationary distribution: pi @ transition = pi with pi summing to 1
+    system = np.vstack([transition.T - np.eye(size), np.ones(size)])
+    target = np.zeros(size + 1)
+    target[-1] = 1.0
+    resting = np.linalg.lstsq(system, target, rcond=None)[0]
+    resting = np.clip(resting, 0.0, None)
+    resting /= resting.sum()
+
+    # Landing counts squares a token touches at the end of a roll, so a
+    # GO_TO_JAIL square is "landed on" even though the token leaves it.
+    landing = resting @ roll
+
+    for array in (transition, resting, landing):
+        array.setflags(write=False)
+    return transition, resting, landing
+
+
+def transition_matrix(board):
+    return _layout_probabilities(*layout_key(board))[0]
+
+
+def stationary_distribution(board):
+    """Long-run chance that a token rests on each space between turns."""
+    return _layout_probabilities(*layout_key(board))[1]
+
+
+def landing_probabilities(board):
+    """Long-run chance that a single roll lands on each space."""
+    return _layout_probabilities(*layout_key(board))[2]
+
+
+def _property_arrays(board):
+    positions = np.array([i for i, space in enumerate(board.spaces) if space.space_type == "PROPERTY"], dtype=int)
+    rents = np.array([board.spaces[i].rent for i in positions], dtype=float)
+    return positions, rents
+
+
+def expected_rents(board):
+    """
+    Expected rent each property brings its owner per opponent roll, with the
+    color-set doubling applied where the owner holds the whole set.
+    Returns a dict of position -> expected rent (unowned properties give 0).
+    """
+    landing = landing_probabilities(board)
+    positions, rents = _property_arrays(board)
+    multipliers = np.zeros(len(positions))
+    for k, pos in enumerate(positions):
+        space = board.spaces[pos]
+        owner = space.owner
+        if owner is None:
+            continue
+        color_set = board.color_map.get(space.color)
+        multipliers[k] = 2.0 if color_set and owner.owns_color_set(space.color, len(color_set)) else 1.0
+    expected = landing[positions] * rents * multipliers
+    return dict(zip(positions.tolist(), expected.tolist()))
+
+
+def auto_price(board, min_price=50, max_price=300):
+    """
+    Reprices the board's properties by how often they are landed on: the most
+    visited property costs `max_price`, the least visited `min_price`.
+    Rent stays at 10% of the price, as on generated boards.
+    """
+    positions, _ = _property_arrays(board)
+    if not len(positions):
+        return
+    landing = landing_probabilities(board)[positions]
+    spread = landing.max() - landing.min()
+    scale = (landing - landing.min()) / spread if spread > 0 else np.full(len(positions), 0.5)
+    prices = np.round((min_price + scale * (max_price - min_price)) / 10) * 10
+    for pos, price in zip(positions.tolist(), prices.astype(int).tolist()):
+        space = board.spaces[pos]
+        # Definitions are shared with other games, so this board gets its own
+        space.definition = space.definition._replace(price=price, rent=max(1, int(price * 0.1)))
+    board.static_cache = None
+
+
+def board_report(game, hottest=5):
+    """Landing odds per space, hottest squares and expected rent per owner for a game."""
+    board = game.board
+    landing = landing_probabilities(board)
+    rents = expected_rents(board)
+    opponents = max(len(game.players) - 1, 0)
+
+    owners = {}
+    for pos, expected in rents.items():
+        owner = board.spaces[pos].owner
+        if owner is not None:
+            owners[owner.name] = owners.get(owner.name, 0.0) + expected * opponents
+
+    spaces = []
+    for i, space in enumerate(board.spaces):
+        entry = {"position": i, "name": space.name, "type": space.space_type,
+                 "landingProbability": round(float(landing[i]), 5)}
+        if i in rents:
+            entry["expectedRentPerRoll"] = round(rents[i], 3)
+        spaces.append(entry)
+
+    order = np.argsort(landing)[::-1][:hottest]
+    return {
+        "hottest": [spaces[i] for i in order.tolist()],
+        "spaces": spaces,
+        # Expected rent an owner collects over one full round of opponent rolls
+        "expectedRentPerRound": {name: round(value, 3) for name, value in owners.items()},
+    }
@@ -1,12 +1,60 @@
-from flask import Flask, render_template, jsonify, request
-from game import Game
+import atexit
+import os
+import time
+from flask import Flask, Response, render_template, jsonify, request, abort, g
 from config import SETTINGS
 from command_parser import parse_command
+from events import format_sse
+from metrics import METRICS
+from profiler import PROFILER
+from rooms import RoomRegistry, DEFAULT_ROOM
+from serialization import board_payload, compact_state_json
+
+try:
+    import analytics
+except ImportError: # NumPy is optional; only the analytics features need it
+    analytics = None
 
 app = Flask(__name__)
+DEBUG = os.environ.get("FLASK_DEBUG", "1") == "1"
+
+# Every game lives in a room. The un-prefixed /api/... routes use the default room.
+rooms = RoomRegistry(
+    SETTINGS,
+    max_rooms=SETTINGS.get("MAX_ROOMS", 100),
+    idle_timeout=SETTINGS.get("ROOM_IDLE_TIMEOUT_SECONDS", 3600),
+)
+# In debug mode `python app.py` runs this module twice: in the reloader process,
+# which only watches files, and in the child it starts to serve requests. Only
+# the serving process may restore games, journal them and run their timers.
+if not (__name__ == '__main__' and DEBUG and os.environ.get("WERKZEUG_RUN_MAIN") != "true"):
+    # Resume games saved before the last shutdown or crash (needs PERSISTENCE_DIR)
+    rooms.restore_persisted()
+    rooms.scheduler.start()
+    atexit.register(rooms.close_all)
+
+def json_response(body):
+    return Response(body, mimetype='application/json')
+
+def get_room(room_id):
+    try:
+        return rooms.get(room_id)
+    except ValueError:
+        abort(404)
+
+@app.before_request
+def start_timer():
+    if METRICS.enabled:
+        g.request_started = time.perf_counter()
 
-# Create a single, global game instance
-game_instance = Game(config=SETTINGS)
+@app.after_request
+def record_request(response):
+    started = g.pop('request_started', None)
+    # Event streams stay open for minutes and would swamp the latency histogram
+    if started is not None and request.endpoint not in (None, 'events', 'static'):
+        METRICS.observe("monopoly_http_request_seconds", time.perf_counter() - started,
+                        endpoint=request.endpoint, status=response.status_code)
+    return response
 
 @app.route('/')
 def index():
@@ -19,56 +67,245 @@ def setup():
     return render_template('setup.html')
 
 @app.route('/api/game_state')
-def game_state():
-    """Provides the full game state as JSON."""
-    return jsonify(game_instance.get_state())
+@app.route('/api/<room_id>/game_state')
+def game_state(room_id=DEFAULT_ROOM):
+    """
+    Provides the game state as JSON. With `?since=<version>` only the changes
+    after that version are returned, or an empty 304 if there are none.
+    `?compact=1` returns the full state as a compact payload that leaves out
+    the static board (see /api/<room>/board).
+    """
+    room = get_room(room_id)
+    if request.args.get('compact') == '1':
+        return json_response(room.cached("compact_state", compact_state_json))
+    body = room.state_body(since=request.args.get('since', type=int))
+    if body is None:
+        return '', 304
+    return json_response(body)
+
+@app.route('/api/board')
+@app.route('/api/<room_id>/board')
+def board(room_id=DEFAULT_ROOM):
+    """
+    The static part of the board (names, types, colors, prices, rents and
+    images), serialized once per board and validated with its ETag.
+    """
+    room = get_room(room_id)
+    with room.lock:
+        body, etag = board_payload(room.game.board)
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = json_response(body)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/log')
+@app.route('/api/<room_id>/log')
+def game_log(room_id=DEFAULT_ROOM):
+    """
+    Pages through the game log: `?after=<seq>&limit=N` returns up to N entries
+    newer than sequence number `seq` (the oldest retained entries without `after`).
+    """
+    room = get_room(room_id)
+    after = request.args.get('after', type=int)
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 500)
+    with room.lock:
+        log = room.game.log
+        entries = log.entries(after=after, limit=limit)
+        return jsonify({"entries": entries, "firstSeq": log.first_seq, "nextSeq": log.next_seq})
+
+@app.route('/api/events')
+@app.route('/api/<room_id>/events')
+def events(room_id=DEFAULT_ROOM):
+    """
+    Streams game state updates as Server-Sent Events. The first event brings the
+    client up to date from `?since=<version>`; every later event is a delta.
+    """
+    room = get_room(room_id)
+    since = request.args.get('since', type=int)
+
+    def stream():
+        event_bus = room.event_bus
+        with room.lock:
+            last_id = event_bus.last_id
+            initial = room.game.get_state(since=since)
+            if initial is not None:
+                initial = format_sse("state", initial)
+        room.subscribe()
+        try:
+            if initial is not None:
+                yield initial
+            while not room.closed:
+                messages, last_id = event_bus.wait(last_id, timeout=15)
+                if messages is None:
+                    # Too far behind the buffer; the client refetches the full state.
+                    yield format_sse("resync", {})
+                elif messages:
+                    yield ''.join(messages)
+                else:
+                    yield ": keepalive\n\n"
+        finally:
+            room.unsubscribe()
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream(), mimetype='text/event-stream', headers=headers)
 
 @app.route('/api/command', methods=['POST'])
-def handle_command():
+@app.route('/api/<room_id>/command', methods=['POST'])
+def handle_command(room_id=DEFAULT_ROOM):
     """Receives and processes a command from the client."""
-    print("--- Received a command! ---") # For debugging
     data = request.get_json()
     if not data or 'message' not in data or 'player' not in data:
         return jsonify({"error": "Invalid command format"}), 400
 
+    room = get_room(room_id)
     player_name = data['player']
     message = data['message']
 
-    # Use the existing command parser
-    command_data = parse_command(message, player_name, game_instance.game_state)
+    with room.lock:
+        game = room.game
+        # Use the existing command parser
+        command_data = parse_command(message, player_name, game.game_state)
 
-    if command_data:
-        command = command_data.get("command")
-        # The game engine's run_command is the new entry point
-        game_instance.run_command(command, player_name)
-    else:
-        game_instance._add_log(f"Invalid command or not allowed in current state: '{message}'")
+        if command_data:
+            command = command_data.get("command")
+            # The room runs the command on its game and journals it
+            room.run_command(command, player_name, command_data.get("args"))
+        else:
+            game._add_log(f"Invalid command or not allowed in current state: '{message}'")
+
+        # Return the updated game state, as a delta if the client sent its version
+        since = data.get('since')
+        body = room.state_body(since=since) if isinstance(since, int) else None
+        return json_response(body or room.state_body())
+
+@app.route('/api/chat', methods=['POST'])
+@app.route('/api/<room_id>/chat', methods=['POST'])
+def handle_chat_batch(room_id=DEFAULT_ROOM):
+    """
+    Receives a batch of raw chat messages: {"messages": [{"player": ..., "message": ...}, ...]}.
+    Non-command noise, duplicates and rate-limited messages are dropped before
+    any game work; the rest are applied in order.
+    """
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('messages'), list):
+        return jsonify({"error": "Invalid batch format"}), 400
+
+    room = get_room(room_id)
+    accepted = room.ingestor.submit(data['messages'])
+    applied = room.ingestor.drain() if accepted else 0
+    return jsonify({"accepted": accepted, "applied": applied, "version": room.game.version})
 
-    # Return the updated game state
-    return jsonify(game_instance.get_state())
+@app.route('/api/chat/stats')
+@app.route('/api/<room_id>/chat/stats')
+def chat_stats(room_id=DEFAULT_ROOM):
+    """Returns the chat ingestion throughput counters for the room."""
+    return jsonify(get_room(room_id).ingestor.stats())
+
+@app.route('/api/votes')
+@app.route('/api/<room_id>/votes')
+def votes(room_id=DEFAULT_ROOM):
+    """The crowd's running tally for the current move, when crowd voting is on."""
+    room = get_room(room_id)
+    if room.voting is None:
+        return jsonify({"error": "Crowd voting is disabled (set CROWD_VOTING in config.py)"}), 404
+    return jsonify(room.voting.tally())
+
+@app.route('/api/analytics')
+@app.route('/api/<room_id>/analytics')
+def board_analytics(room_id=DEFAULT_ROOM):
+    """Landing probabilities, hottest squares and expected rents for the room's board."""
+    if analytics is None:
+        return jsonify({"error": "Analytics require NumPy (pip install numpy)"}), 501
+    room = get_room(room_id)
+    return jsonify(room.cached("analytics", analytics.board_report))
 
 @app.route('/api/new_game', methods=['POST'])
-def new_game():
-    """Creates a new game instance, resetting the server state."""
-    global game_instance
-    options = request.get_json()
+@app.route('/api/<room_id>/new_game', methods=['POST'])
+def new_game(room_id=DEFAULT_ROOM):
+    """Starts a new game in the room, replacing the one that was there."""
+    room = get_room(room_id)
+    options = request.get_json(silent=True) or {}
 
     # Basic validation
-    board_size = int(options.get("board_size", 12))
+    try:
+        board_size = int(options.get("board_size", 12))
+        seed = int(options["seed"]) if options.get("seed") is not None else None
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid game options: {e}"}), 400
     image_urls = options.get("image_urls", {})
 
     game_options = {
         "board_size": board_size,
         "image_urls": image_urls
     }
+    if seed is not None:
+        game_options["seed"] = seed
+    if options.get("template"):
+        game_options["template"] = options["template"]
+    if options.get("auto_price"):
+        if analytics is None:
+            return jsonify({"error": "Automatic pricing requires NumPy (pip install numpy)"}), 501
+        game_options["auto_price"] = True
+
+    print(f"--- Creating new game in room '{room.room_id}' with options: {game_options} ---")
+    with room.lock:
+        try:
+            room.new_game(game_options)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return json_response(room.state_body())
+
+@app.route('/api/leaderboard')
+def leaderboard():
+    """Top players across all rooms: `?by=wins|games|rent&limit=N`."""
+    if rooms.stats is None:
+        return jsonify({"error": "Stats are disabled (set STATS_DB_PATH in config.py)"}), 501
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+    try:
+        return jsonify(rooms.stats.leaderboard(by=request.args.get('by', 'wins'), limit=limit))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/api/players/<player_name>')
+def player_stats(player_name):
+    """A viewer's totals, most-owned colors and recent games."""
+    if rooms.stats is None:
+        return jsonify({"error": "Stats are disabled (set STATS_DB_PATH in config.py)"}), 501
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    history = rooms.stats.player_history(player_name, limit=limit)
+    if history is None:
+        return jsonify({"error": f"No finished games for {player_name}"}), 404
+    return jsonify(history)
 
-    print(f"--- Creating new game with options: {game_options} ---")
-    game_instance = Game(config=SETTINGS, game_options=game_options)
+@app.route('/metrics')
+def metrics():
+    """Hot-path timings, counters and per-room gauges in the Prometheus text format."""
+    body = METRICS.render(rooms.metric_families())
+    return Response(body, mimetype='text/plain; version=0.0.4')
 
-    return jsonify(game_instance.get_state())
+@app.route('/api/profiler', methods=['GET', 'POST'])
+def profiler():
+    """
+    GET returns what the sampling profiler has seen. POST {"running": true|false}
+    starts or stops it, if PROFILER_ALLOWED is set; {"clear": true} drops the samples.
+    """
+    if request.method == 'POST':
+        if not SETTINGS.get("PROFILER_ALLOWED"):
+            return jsonify({"error": "The profiler is disabled (set PROFILER_ALLOWED in config.py)"}), 403
+        options = request.get_json(silent=True) or {}
+        if options.get("clear"):
+            PROFILER.clear()
+        if options.get("running") is True:
+            PROFILER.start()
+        elif options.get("running") is False:
+            PROFILER.stop()
+    return jsonify(PROFILER.report(limit=request.args.get('limit', 25, type=int)))
 
 if __name__ == '__main__':
-    # The game is already initialized when the app starts.
-    # The server runs in a single thread, so we don't have to worry about race conditions
-    # for this simple implementation.
-    app.run(debug=True, port=5002)
+    # Development server. Each room serializes its own commands with a lock, so
+    # the threaded server can serve several rooms at once. For production use
+    # the async app instead: gunicorn -c gunicorn.conf.py asgi:app
+    app.run(debug=DEBUG, port=5002)
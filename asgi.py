@@ -0,0 +1,475 @@
+# monopoly/asgi.py
+"""
+Asynchronous serving path for the game API.
+
+Commands are not run inside the request: they are queued to a worker task per
+room and the request returns at once with an acknowledgement and the game
+version it was queued against. Clients see the result over the event stream,
+which is served without a thread per subscriber.
+
+Nothing on the event loop waits for a room lock. The worker applies commands
+on a thread, since a command can fsync the journal or save to the state
+store, and reads are answered from the room's cached bodies, falling back to
+a thread only when a body has to be built.
+
+Run it with an ASGI server, e.g. `uvicorn asgi:app --port 5002`, or in
+production with `gunicorn -c gunicorn.conf.py asgi:app`.
+"""
+import asyncio
+import json
+import mimetypes
+import os
+import re
+import time
+import traceback
+from urllib.parse import parse_qs, unquote
+
+from jinja2 import Environment, FileSystemLoader
+
+from command_parser import parse_command
+from config import SETTINGS
+from events import format_sse
+from metrics import METRICS
+from profiler import PROFILER
+from rooms import RoomRegistry, DEFAULT_ROOM, NOT_CACHED
+from serialization import dumps, board_payload, compact_state_json
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+
+API_ROUTE = re.compile(
+    r'^/api/(?:(?P<room>[A-Za-z0-9_-]{1,64})/)?'
+    r'(?P<endpoint>game_state|board|events|log|command|chat/stats|chat|votes|new_game|analytics)$'
+)
+
+rooms = RoomRegistry(
+    SETTINGS,
+    max_rooms=SETTINGS.get("MAX_ROOMS", 100),
+    idle_timeout=SETTINGS.get("ROOM_IDLE_TIMEOUT_SECONDS", 3600),
+)
+
+# The HTML pages are the same Jinja templates the Flask app renders.
+templates = Environment(loader=FileSystemLoader(os.path.join(BASE_DIR, "templates")))
+templates.globals["url_for"] = lambda endpoint, filename: f"/static/{filename}"
+
+
+# Most commands a room worker applies before the loop gets to run again
+APPLY_BATCH = 100
+
+
+class RoomWorker:
+    """Applies one room's queued commands in order, in batches on a worker thread."""
+    def __init__(self, room):
+        self.room = room
+        self.queue = asyncio.Queue(maxsize=SETTINGS.get("COMMAND_QUEUE_SIZE", 10000))
+        self.changed = asyncio.Event()
+        self.chat_queued = False
+        self._loop = asyncio.get_running_loop()
+        # Wakes every stream subscriber of the room with a single Event swap.
+        room.event_bus.add_listener(self._on_publish)
+        self.task = asyncio.create_task(self._run())
+
+    def _on_publish(self):
+        try:
+            self._loop.call_soon_threadsafe(self._notify)
+        except RuntimeError:
+            pass # The loop has shut down; no stream is left to wake
+
+    def _notify(self):
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    async def _run(self):
+        while True:
+            jobs = [await self.queue.get()]
+            while len(jobs) < APPLY_BATCH and not self.queue.empty():
+                jobs.append(self.queue.get_nowait())
+            await asyncio.to_thread(self._apply_all, jobs)
+
+    def _apply_all(self, jobs):
+        for job in jobs:
+            try:
+                self._apply(job)
+            except Exception:
+                # One bad command must not stop the room's worker
+                traceback.print_exc()
+
+    def _apply(self, job):
+        kind, player_name, message = job
+        room = self.room
+        if kind == "chat":
+            self.chat_queued = False
+            room.ingestor.drain()
+            return
+        with room.lock:
+            command_data = parse_command(message, player_name, room.game.game_state)
+            if command_data:
+                room.run_command(command_data["command"], player_name, command_data.get("args"))
+            else:
+                room.game._add_log("Invalid command or not allowed in current state: '{}'", message)
+
+    def stop(self):
+        self.room.event_bus.remove_listener(self._on_publish)
+        self._loop.call_soon_threadsafe(self.task.cancel) # May be called from the scheduler thread
+
+
+workers = {}
+
+def get_worker(room):
+    worker = workers.get(room.room_id)
+    if worker is None or worker.room is not room:
+        if worker is not None:
+            worker.stop() # The room was evicted and recreated
+        worker = workers[room.room_id] = RoomWorker(room)
+    return worker
+
+def drop_worker(room):
+    """Stops the worker of a room the registry evicted, so it no longer keeps the room alive."""
+    worker = workers.get(room.room_id)
+    if worker is not None and worker.room is room:
+        del workers[room.room_id]
+        worker.stop()
+
+rooms.add_close_listener(drop_worker)
+
+
+# --- Responses ---
+
+async def send_response(send, status, body=b"", content_type="application/json", headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode()),
+                    *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+async def send_json(send, data, status=200):
+    await send_response(send, status, dumps(data))
+
+async def read_json(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        return None
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+# --- Room reads ---
+# A room's lock can be held for a while by a command, a turn timer or the
+# state store poller, so it is only ever taken on a thread.
+
+async def cached(room, key, build):
+    value = room.cached_value(key)
+    if value is NOT_CACHED:
+        value = await asyncio.to_thread(room.cached, key, build)
+    return value
+
+async def state_body(room, since=None):
+    body = room.cached_state_body(since)
+    if body is NOT_CACHED:
+        body = await asyncio.to_thread(room.state_body, since)
+    return body
+
+def _board(room):
+    with room.lock:
+        return board_payload(room.game.board)
+
+def _log_page(room, after, limit):
+    with room.lock:
+        log = room.game.log
+        return {"entries": log.entries(after=after, limit=limit), "firstSeq": log.first_seq, "nextSeq": log.next_seq}
+
+def _new_game(room, game_options):
+    with room.lock:
+        room.new_game(game_options)
+        return room.state_body()
+
+
+# --- Endpoints ---
+
+async def game_state(room, scope, query, receive, send):
+    if query.get("compact") == ["1"]:
+        await send_response(send, 200, await cached(room, "compact_state", compact_state_json))
+        return
+    body = await state_body(room, since=_int_arg(query, "since"))
+    if body is None:
+        await send_response(send, 304)
+    else:
+        await send_response(send, 200, body)
+
+async def board(room, scope, query, receive, send):
+    body, etag = room.game.board.static_cache or await asyncio.to_thread(_board, room)
+    quoted = f'"{etag}"'.encode()
+    headers = [(b"etag", quoted), (b"cache-control", b"no-cache")]
+    if_none_match = dict(scope["headers"]).get(b"if-none-match", b"")
+    if quoted in if_none_match or if_none_match == b"*":
+        await send_response(send, 304, headers=headers)
+    else:
+        await send_response(send, 200, body, headers=headers)
+
+async def game_log(room, scope, query, receive, send):
+    after = _int_arg(query, "after")
+    limit = min(max(_int_arg(query, "limit") or 100, 1), 500)
+    await send_json(send, await asyncio.to_thread(_log_page, room, after, limit))
+
+async def events(room, scope, query, receive, send):
+    worker = get_worker(room)
+    since = _int_arg(query, "since")
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no")],
+    })
+    # Events after last_id that the initial state already covers are dropped by the client as stale.
+    last_id = room.event_bus.last_id
+    initial = await state_body(room, since)
+    if initial is not None:
+        await send({"type": "http.response.body", "body": b"event: state\ndata: " + initial + b"\n\n", "more_body": True})
+
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    room.subscribe()
+    try:
+        while not room.closed:
+            changed = asyncio.ensure_future(worker.changed.wait())
+            done, _ = await asyncio.wait({changed, disconnected}, timeout=15, return_when=asyncio.FIRST_COMPLETED)
+            changed.cancel()
+            if disconnected in done:
+                await send({"type": "http.response.body", "body": b""})
+                return
+            messages, last_id = room.event_bus.events_after(last_id)
+            if messages is None:
+                chunk = format_sse("resync", {})
+            elif messages:
+                chunk = "".join(messages)
+            else:
+                chunk = ": keepalive\n\n"
+            await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+        await send({"type": "http.response.body", "body": b""}) # The room was closed
+    finally:
+        room.unsubscribe()
+        disconnected.cancel()
+
+async def command(room, scope, query, receive, send):
+    data = await read_json(receive)
+    if not data or 'message' not in data or 'player' not in data:
+        await send_json(send, {"error": "Invalid command format"}, 400)
+        return
+    worker = get_worker(room)
+    try:
+        worker.queue.put_nowait(("command", data['player'], data['message']))
+    except asyncio.QueueFull:
+        await send_json(send, {"error": "Too many queued commands"}, 503)
+        return
+    await send_json(send, {"queued": True, "version": room.game.version, "queueDepth": worker.queue.qsize()}, 202)
+
+async def chat(room, scope, query, receive, send):
+    data = await read_json(receive)
+    if not data or not isinstance(data.get('messages'), list):
+        await send_json(send, {"error": "Invalid batch format"}, 400)
+        return
+    accepted = room.ingestor.submit(data['messages'])
+    if accepted:
+        worker = get_worker(room)
+        # One queued drain picks up every batch submitted before it runs
+        if not worker.chat_queued:
+            try:
+                worker.queue.put_nowait(("chat", None, None))
+                worker.chat_queued = True
+            except asyncio.QueueFull:
+                pass # The next batch queues the drain instead
+    await send_json(send, {"queued": True, "accepted": accepted, "version": room.game.version}, 202)
+
+async def chat_stats(room, scope, query, receive, send):
+    await send_json(send, room.ingestor.stats())
+
+async def votes(room, scope, query, receive, send):
+    if room.voting is None:
+        await send_json(send, {"error": "Crowd voting is disabled (set CROWD_VOTING in config.py)"}, 404)
+    else:
+        await send_json(send, room.voting.tally())
+
+async def new_game(room, scope, query, receive, send):
+    options = await read_json(receive) or {}
+    try:
+        game_options = {
+            "board_size": int(options.get("board_size", 12)),
+            "image_urls": options.get("image_urls", {}),
+        }
+        if options.get("seed") is not None:
+            game_options["seed"] = int(options["seed"])
+        if options.get("template"):
+            game_options["template"] = options["template"]
+        if options.get("auto_price"):
+            game_options["auto_price"] = True
+        body = await asyncio.to_thread(_new_game, room, game_options)
+    except ImportError:
+        await send_json(send, {"error": "Automatic pricing requires NumPy (pip install numpy)"}, 501)
+        return
+    except (TypeError, ValueError) as e: # Bad options, e.g. a board_size that is not a number
+        await send_json(send, {"error": str(e)}, 400)
+        return
+    await send_response(send, 200, body)
+
+async def analytics(room, scope, query, receive, send):
+    try:
+        import analytics as board_analytics
+    except ImportError:
+        await send_json(send, {"error": "Analytics require NumPy (pip install numpy)"}, 501)
+        return
+    await send_json(send, await cached(room, "analytics", board_analytics.board_report))
+
+ENDPOINTS = {
+    ("GET", "game_state"): game_state,
+    ("GET", "board"): board,
+    ("GET", "log"): game_log,
+    ("GET", "events"): events,
+    ("POST", "command"): command,
+    ("POST", "chat"): chat,
+    ("GET", "chat/stats"): chat_stats,
+    ("GET", "votes"): votes,
+    ("POST", "new_game"): new_game,
+    ("GET", "analytics"): analytics,
+}
+
+
+async def metrics(scope, receive, send):
+    body = METRICS.render(rooms.metric_families()).encode()
+    await send_response(send, 200, body, "text/plain; version=0.0.4")
+
+async def profiler(scope, receive, send):
+    """Same contract as the Flask /api/profiler route."""
+    if scope["method"] == "POST":
+        if not SETTINGS.get("PROFILER_ALLOWED"):
+            await send_json(send, {"error": "The profiler is disabled (set PROFILER_ALLOWED in config.py)"}, 403)
+            return
+        options = await read_json(receive) or {}
+        if options.get("clear"):
+            PROFILER.clear()
+        if options.get("running") is True:
+            PROFILER.start()
+        elif options.get("running") is False:
+            await asyncio.to_thread(PROFILER.stop)
+    query = parse_qs(scope.get("query_string", b"").decode())
+    await send_json(send, PROFILER.report(limit=_int_arg(query, "limit") or 25))
+
+
+async def leaderboard(scope, receive, send):
+    """Same contract as the Flask /api/leaderboard route."""
+    if rooms.stats is None:
+        await send_json(send, {"error": "Stats are disabled (set STATS_DB_PATH in config.py)"}, 501)
+        return
+    query = parse_qs(scope.get("query_string", b"").decode())
+    limit = min(max(_int_arg(query, "limit") or 10, 1), 100)
+    try:
+        await send_json(send, rooms.stats.leaderboard(by=query.get("by", ["wins"])[0], limit=limit))
+    except ValueError as e:
+        await send_json(send, {"error": str(e)}, 400)
+
+async def player_stats(scope, receive, send, player_name):
+    """Same contract as the Flask /api/players/<name> route."""
+    if rooms.stats is None:
+        await send_json(send, {"error": "Stats are disabled (set STATS_DB_PATH in config.py)"}, 501)
+        return
+    query = parse_qs(scope.get("query_string", b"").decode())
+    limit = min(max(_int_arg(query, "limit") or 20, 1), 100)
+    history = rooms.stats.player_history(player_name, limit=limit)
+    if history is None:
+        await send_json(send, {"error": f"No finished games for {player_name}"}, 404)
+    else:
+        await send_json(send, history)
+
+
+async def serve_static(path, send):
+    file_path = os.path.normpath(os.path.join(STATIC_DIR, path))
+    if not file_path.startswith(STATIC_DIR + os.sep) or not os.path.isfile(file_path):
+        await send_response(send, 404, b"Not Found", "text/plain")
+        return
+    with open(file_path, "rb") as f:
+        body = f.read()
+    content_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+    await send_response(send, 200, body, content_type)
+
+def _int_arg(query, name):
+    try:
+        return int(query[name][0])
+    except (KeyError, ValueError):
+        return None
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            rooms.restore_persisted()
+            rooms.scheduler.start()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            for worker in workers.values():
+                worker.stop()
+            await asyncio.to_thread(rooms.close_all)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    path, method = scope["path"], scope["method"]
+    if path in ("/", "/setup") and method == "GET":
+        page = templates.get_template("index.html" if path == "/" else "setup.html").render()
+        await send_response(send, 200, page.encode(), "text/html; charset=utf-8")
+        return
+    if path.startswith("/static/") and method == "GET":
+        await serve_static(path[len("/static/"):], send)
+        return
+    if path == "/metrics" and method == "GET":
+        await metrics(scope, receive, send)
+        return
+    if path == "/api/profiler" and method in ("GET", "POST"):
+        await profiler(scope, receive, send)
+        return
+    if path == "/api/leaderboard" and method == "GET":
+        await leaderboard(scope, receive, send)
+        return
+    if path.startswith("/api/players/") and method == "GET":
+        player_name = unquote(path[len("/api/players/"):])
+        if player_name and "/" not in player_name:
+            await player_stats(scope, receive, send, player_name)
+            return
+
+    match = API_ROUTE.match(path)
+    endpoint = match and ENDPOINTS.get((method, match.group("endpoint")))
+    if endpoint is None:
+        await send_response(send, 404, b"Not Found", "text/plain")
+        return
+    room = rooms.get(match.group("room") or DEFAULT_ROOM)
+    query = parse_qs(scope.get("query_string", b"").decode())
+    if not METRICS.enabled or endpoint is events:
+        await endpoint(room, scope, query, receive, send)
+        return
+
+    status = []
+    async def recording_send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+        await send(message)
+    started = time.perf_counter()
+    await endpoint(room, scope, query, receive, recording_send)
+    METRICS.observe("monopoly_http_request_seconds", time.perf_counter() - started,
+                    endpoint=endpoint.__name__, status=status[0] if status else 0)
@@ -0,0 +1,181 @@
+# monopoly/benchmark.py
+"""
+Microbenchmarks for the hot paths: command parsing, command dispatch, state
+serialization and board generation, across board sizes.
+
+Results are written as JSON so two runs can be compared, e.g. before and
+after a change:
+
+    python benchmark.py --output before.json
+    python benchmark.py --output after.json --compare before.json
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import timeit
+
+from board import Board, get_template
+from command_parser import parse_command
+from config import SETTINGS
+from game import Game
+from serialization import dumps, orjson, board_payload, compact_state_json
+
+DEFAULT_SIZES = [12, 40, 100, 400, 1000]
+
+# A slice of chat as it arrives: mostly chatter, some commands, some in other languages.
+CHAT_SAMPLE = [
+    "lol this game is great",
+    "!roll",
+    "!buy",
+    "hello everyone 👋",
+    "!JOIN",
+    "!status",
+    "!pass",
+    "! tirar",
+    "what does !roll do?",
+    "！ロール",
+    "!kaufen",
+    "gg",
+]
+
+
+def measure(func, min_time=0.1, repeat=5):
+    """Times `func` and returns per-call statistics in microseconds."""
+    timer = timeit.Timer(func)
+    # One quick call count estimate, then rounds of about `min_time` seconds each
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * min_time / elapsed))
+    times = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    times.sort()
+    return {"calls": number * repeat, "best_us": round(times[0], 3), "median_us": round(times[len(times) // 2], 3)}
+
+
+def new_game(board_size, seed=0, players=4):
+    game = Game(config=SETTINGS, game_options={"board_size": board_size, "seed": seed})
+    for i in range(players):
+        game.run_command("join", f"viewer{i}")
+    game.run_command("start", "viewer0")
+    return game
+
+
+def next_move(game):
+    """The command a player would send next: buy every other offer, otherwise roll."""
+    if game.pending_action:
+        return "buy" if game.turns_played % 2 else "pass", game.pending_action["player"]
+    return "roll", game.get_current_player().name
+
+
+def warmed_up_game(board_size, moves=300, seed=0):
+    """A game some way in, so owners, money and the log look like a real one."""
+    game = new_game(board_size, seed)
+    for _ in range(moves):
+        if game.game_state != "IN_PROGRESS":
+            break
+        game.run_command(*next_move(game))
+    return game
+
+
+def bench_parse(min_time):
+    messages = [(message, "viewer0") for message in CHAT_SAMPLE]
+    def run():
+        for message, player_name in messages:
+            parse_command(message, player_name, "IN_PROGRESS")
+    result = measure(run, min_time)
+    # Report the cost of a single message
+    for key in ("best_us", "median_us"):
+        result[key] = round(result[key] / len(messages), 3)
+    return result
+
+
+def bench_size(board_size, min_time):
+    results = {}
+    rng = random.Random(0)
+    results["board_generation"] = measure(lambda: Board(board_size, rng=rng), min_time)
+    template = get_template(board_size, 0)
+    results["board_from_template"] = measure(lambda: Board(template=template), min_time)
+
+    holder = [warmed_up_game(board_size)]
+    def dispatch():
+        game = holder[0]
+        if game.game_state != "IN_PROGRESS":
+            game = holder[0] = new_game(board_size, seed=game.seed + 1)
+        game.run_command(*next_move(game))
+    results["dispatch"] = measure(dispatch, min_time)
+
+    game = warmed_up_game(board_size)
+    def full_state():
+        game._touch() # Forces the snapshot to be rebuilt
+        return game.get_state()
+    results["get_state_full"] = measure(full_state, min_time)
+    results["get_state_full_json"] = measure(lambda: dumps(full_state()), min_time)
+
+    def delta_state():
+        since = game.version
+        game._touch()
+        return game.get_state(since=since)
+    results["get_state_delta_json"] = measure(lambda: dumps(delta_state()), min_time)
+
+    def compact_state():
+        game._touch()
+        return compact_state_json(game)
+    results["compact_state_json"] = measure(compact_state, min_time)
+
+    def static_board():
+        game.board.static_cache = None
+        return board_payload(game.board)
+    results["board_payload"] = measure(static_board, min_time)
+    return results
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, min_time=0.1):
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "orjson": orjson is not None,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "parse_command": bench_parse(min_time),
+        "sizes": {str(size): bench_size(size, min_time) for size in sizes},
+    }
+
+
+def compare(current, baseline):
+    """Yields (benchmark, baseline_us, current_us, ratio) for every benchmark present in both runs."""
+    pairs = [("parse_command", current["parse_command"], baseline.get("parse_command"))]
+    for size, results in current["sizes"].items():
+        for name, result in results.items():
+            pairs.append((f"{name}[{size}]", result, baseline.get("sizes", {}).get(size, {}).get(name)))
+    for name, result, old in pairs:
+        if old:
+            yield name, old["median_us"], result["median_us"], result["median_us"] / old["median_us"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Mini Monopoly microbenchmarks.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--min-time", type=float, default=0.1, help="seconds per timing round")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="print the change against an earlier results file")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.min_time)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"{'benchmark':<32}{'baseline us':>14}{'current us':>14}{'change':>10}")
+        for name, old, new, ratio in compare(results, baseline):
+            print(f"{name:<32}{old:>14.2f}{new:>14.2f}{ratio - 1:>+10.1%}")
+    elif not args.output:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
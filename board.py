@@ -1,91 +1,217 @@
+import collections
+import functools
 import random
 import math
 
+# The fixed part of a property; shared by every game on the same template.
+PropertyDef = collections.namedtuple("PropertyDef", ["name", "color", "price", "rent"])
+
+
 class Space:
-    def __init__(self, name, space_type, image_url=None):
-        self.name = name
-        self.space_type = space_type # e.g., "PROPERTY", "CHANCE", "TAX", "GO"
-        self.image_url = image_url
+    """A non-property square. Spaces are shared between games, so they never change."""
+    __slots__ = ("name", "space_type")
+
+    def __init__(self, name, space_type):
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "space_type", space_type) # e.g., "CHANCE", "TAX", "GO"
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Spaces are shared between games and cannot be changed.")
 
     def __str__(self):
         return f"[{self.name}]"
 
-class Property(Space):
-    def __init__(self, name, color, price, rent, image_url=None):
-        super().__init__(name, "PROPERTY", image_url=image_url)
-        self.color = color
-        self.price = price
-        self.rent = rent
-        self.owner = None
+class Property:
+    """
+    A property square in one game: its shared definition plus who owns it.
+    A change of owner is recorded in `changes` (the board's set of changed
+    positions) so the game only re-serializes the spaces that changed.
+    """
+    __slots__ = ("definition", "_owner", "rent_collected", "position", "changes")
+    space_type = "PROPERTY"
+
+    def __init__(self, definition, position=None, changes=None):
+        self.definition = definition
+        self._owner = None
+        self.rent_collected = 0
+        self.position = position
+        self.changes = changes
+
+    @property
+    def owner(self):
+        return self._owner
+
+    @owner.setter
+    def owner(self, player):
+        if player is not self._owner:
+            self._owner = player
+            if self.changes is not None:
+                self.changes.add(self.position)
+
+    @property
+    def name(self):
+        return self.definition.name
+
+    @property
+    def color(self):
+        return self.definition.color
+
+    @property
+    def price(self):
+        return self.definition.price
+
+    @property
+    def rent(self):
+        return self.definition.rent
 
     def __str__(self):
         owner_str = f", Owner: {self.owner.name}" if self.owner else ""
         return f"[{self.name} ({self.color}) - Price: ${self.price}, Rent: ${self.rent}{owner_str}]"
 
-class Board:
-    def __init__(self, num_spaces=12, image_urls=None):
-        if num_spaces < 8 or num_spaces % 4 != 0:
+
+class BoardTemplate:
+    """
+    A validated, immutable board layout: a Space or PropertyDef per position.
+    Any number of games can be played on one template at the same time.
+    """
+    __slots__ = ("name", "layout", "jail_pos", "color_positions")
+
+    def __init__(self, layout, name=None):
+        layout = tuple(layout)
+        size = len(layout)
+        if size < 8 or size % 4 != 0:
             raise ValueError("Number of spaces must be a multiple of 4 and at least 8.")
+        side_len = size // 4
+        corners = {0: "GO", side_len: "JAIL", side_len * 2: "FREE_PARKING", side_len * 3: "GO_TO_JAIL"}
+        for pos, entry in enumerate(layout):
+            if isinstance(entry, PropertyDef):
+                if pos in corners:
+                    raise ValueError(f"Space {pos} must be {corners[pos]}, not a property.")
+                if entry.price <= 0 or entry.rent <= 0:
+                    raise ValueError(f"Property {entry.name!r} needs a positive price and rent.")
+            elif not isinstance(entry, Space):
+                raise ValueError(f"Space {pos} is not a Space or PropertyDef: {entry!r}")
+            elif corners.get(pos, entry.space_type) != entry.space_type:
+                raise ValueError(f"Space {pos} must be {corners[pos]}, not {entry.space_type}.")
+
+        color_positions = {}
+        for pos, entry in enumerate(layout):
+            if isinstance(entry, PropertyDef):
+                color_positions.setdefault(entry.color, []).append(pos)
 
-        self.num_spaces = num_spaces
-        self.image_urls = image_urls if image_urls else {}
-        self.spaces = []
-        self.color_map = {}
-        self.jail_pos = -1
-        self._create_board()
+        self.name = name
+        self.layout = layout
+        self.jail_pos = side_len
+        self.color_positions = {color: tuple(positions) for color, positions in color_positions.items()}
 
     @property
     def size(self):
-        return len(self.spaces)
+        return len(self.layout)
 
-    def _get_sample_properties(self, count):
-        """Generates a list of sample properties."""
-        colors = ["#a86432", "#a83232", "#a87b32", "#8aa832", "#32a857", "#32a8a4", "#3269a8", "#6732a8", "#a8329b"]
-        street_names = ["Oak", "Pine", "Maple", "Cedar", "Elm", "Willow", "Birch", "Aspen", "Spruce", "Hickory"]
-        name_suffixes = ["St", "Ave", "Ln", "Rd", "Blvd", "Ct", "Pl"]
-
-        properties = []
-        for i in range(count):
-            color = random.choice(colors)
-            name = f"{random.choice(street_names)} {random.choice(name_suffixes)}"
-            price = random.randint(5, 30) * 10  # 50 to 300
-            rent = max(1, int(price * 0.1)) # Rent is 10% of price, min 1
-            properties.append(Property(name, color, price, rent, image_url=self.image_urls.get("PROPERTY")))
-        return properties
-
-    def _create_board(self):
-        """Dynamically creates the game board."""
-        self.spaces = [None] * self.num_spaces
+    @classmethod
+    def generate(cls, num_spaces, rng, name=None):
+        """Generates a random layout with the standard mix of properties, chance and tax spaces."""
+        if num_spaces < 8 or num_spaces % 4 != 0:
+            raise ValueError("Number of spaces must be a multiple of 4 and at least 8.")
+        layout = [None] * num_spaces
 
         # 1. Place corners
-        side_len = self.num_spaces // 4
-        self.jail_pos = side_len
-        self.spaces[0] = Space("GO", "GO", image_url=self.image_urls.get("GO"))
-        self.spaces[self.jail_pos] = Space("Jail/Just Visiting", "JAIL", image_url=self.image_urls.get("JAIL"))
-        self.spaces[side_len * 2] = Space("Free Parking", "FREE_PARKING", image_url=self.image_urls.get("FREE_PARKING"))
-        self.spaces[side_len * 3] = Space("Go To Jail", "GO_TO_JAIL", image_url=self.image_urls.get("GO_TO_JAIL"))
+        side_len = num_spaces // 4
+        layout[0] = Space("GO", "GO")
+        layout[side_len] = Space("Jail/Just Visiting", "JAIL")
+        layout[side_len * 2] = Space("Free Parking", "FREE_PARKING")
+        layout[side_len * 3] = Space("Go To Jail", "GO_TO_JAIL")
 
         # 2. Define pool of other spaces
-        num_other_spaces = self.num_spaces - 4
+        num_other_spaces = num_spaces - 4
         num_properties = math.ceil(num_other_spaces * 0.65)
         num_chance = math.ceil(num_other_spaces * 0.20)
         num_tax = num_other_spaces - num_properties - num_chance
 
-        space_pool = []
-        space_pool.extend(self._get_sample_properties(num_properties))
-        space_pool.extend([Space("Chance", "CHANCE", image_url=self.image_urls.get("CHANCE"))] * num_chance)
-        space_pool.extend([Space("Tax", "TAX", image_url=self.image_urls.get("TAX"))] * num_tax)
-        random.shuffle(space_pool)
+        space_pool = _sample_properties(rng, num_properties)
+        space_pool.extend(Space("Chance", "CHANCE") for _ in range(num_chance))
+        space_pool.extend(Space("Tax", "TAX") for _ in range(num_tax))
+        rng.shuffle(space_pool)
 
         # 3. Place other spaces
-        for i in range(self.num_spaces):
-            if self.spaces[i] is None:
-                if space_pool:
-                    self.spaces[i] = space_pool.pop()
-                else: # Should not happen with correct math, but as a fallback
-                    self.spaces[i] = Space("Extra Space", "CHANCE")
-
-        # 4. Populate the color map
+        for i in range(num_spaces):
+            if layout[i] is None:
+                layout[i] = space_pool.pop()
+        return cls(layout, name=name)
+
+
+def _sample_properties(rng, count):
+    """Generates a list of sample property definitions."""
+    colors = ["#a86432", "#a83232", "#a87b32", "#8aa832", "#32a857", "#32a8a4", "#3269a8", "#6732a8", "#a8329b"]
+    street_names = ["Oak", "Pine", "Maple", "Cedar", "Elm", "Willow", "Birch", "Aspen", "Spruce", "Hickory"]
+    name_suffixes = ["St", "Ave", "Ln", "Rd", "Blvd", "Ct", "Pl"]
+
+    properties = []
+    for i in range(count):
+        color = rng.choice(colors)
+        name = f"{rng.choice(street_names)} {rng.choice(name_suffixes)}"
+        price = rng.randint(5, 30) * 10  # 50 to 300
+        rent = max(1, int(price * 0.1)) # Rent is 10% of price, min 1
+        properties.append(PropertyDef(name, color, price, rent))
+    return properties
+
+
+@functools.lru_cache(maxsize=128)
+def get_template(num_spaces, seed):
+    """The generated template for a board size and seed, built once and then reused."""
+    return BoardTemplate.generate(num_spaces, random.Random(f"board:{num_spaces}:{seed}"))
+
+
+# Named layouts that can be picked for a new game instead of a random one
+TEMPLATES = {
+    "mini": get_template(12, 0),
+    "classic": get_template(40, 0),
+    "marathon": get_template(100, 0),
+}
+
+def register_template(name, template):
+    """Makes `template` (a BoardTemplate) available to new games as `name`."""
+    TEMPLATES[name] = template
+
+
+class Board:
+    """One game's board: the template's shared spaces plus a fresh Property per property square."""
+    def __init__(self, num_spaces=12, image_urls=None, rng=None, template=None):
+        if template is None:
+            template = BoardTemplate.generate(num_spaces, rng if rng else random.Random())
+        self.template = template
+        self.num_spaces = template.size
+        # Image URLs are per space type and resolved when a payload is built, not stored per space.
+        self.image_urls = image_urls if image_urls else {}
+        self.jail_pos = template.jail_pos
+        # Positions whose owner changed since Game last serialized the board
+        self.changed_positions = set()
+        self.spaces = [Property(entry, pos, self.changed_positions) if isinstance(entry, PropertyDef) else entry
+                       for pos, entry in enumerate(template.layout)]
+        self.color_map = {color: [self.spaces[pos] for pos in positions]
+                          for color, positions in template.color_positions.items()}
+        # Serialized static description, filled in by serialization.board_payload
+        self.static_cache = None
+
+    @property
+    def size(self):
+        return len(self.spaces)
+
+    def set_spaces(self, spaces):
+        """Replaces the generated spaces, e.g. with ones restored from a snapshot."""
+        if len(spaces) != self.num_spaces:
+            raise ValueError(f"Expected {self.num_spaces} spaces, got {len(spaces)}.")
+        self.spaces = list(spaces)
+        for pos, space in enumerate(self.spaces):
+            if isinstance(space, Property):
+                space.position = pos
+                space.changes = self.changed_positions
+        self.changed_positions.update(range(len(self.spaces)))
+        self.template = None # The spaces no longer come from a template
+        self.static_cache = None
+        self._build_color_map()
+
+    def _build_color_map(self):
         self.color_map = {}
         for space in self.spaces:
             if isinstance(space, Property):
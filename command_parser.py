@@ -1,33 +1,92 @@
 # monopoly/command_parser.py
 import re
+import time
+
+from metrics import METRICS
+
+GAME_STATES = ("WAITING", "IN_PROGRESS", "FINISHED")
+
+# Game states in which each command is accepted (None means any state)
+COMMAND_STATES = {
+    "join": ("WAITING",),
+    "start": ("WAITING",),
+    "roll": ("IN_PROGRESS",),
+    "buy": ("IN_PROGRESS",),
+    "pass": ("IN_PROGRESS",),
+    "status": None,
+    "board": None,
+}
+
+# Chat keywords (without the leading '!') for each command, including translations
+COMMAND_ALIASES = {
+    "join": ["join", "unirse", "entrar", "rejoindre", "参加"],
+    "start": ["start", "empezar", "iniciar", "commencer", "開始"],
+    "roll": ["roll", "tirar", "lanzar", "rolar", "lancer", "サイコロ"],
+    "buy": ["buy", "comprar", "acheter", "kaufen", "買う"],
+    "pass": ["pass", "pasar", "passar", "passer", "パス"],
+    "status": ["status", "estado", "statut"],
+    "board": ["board", "tablero", "tabuleiro", "plateau"],
+}
+
+_SYMBOLS = re.compile(r'[^\w! ]')
+
+
+def _build_command_table():
+    """Maps (keyword, game_state) straight to the command name, built once at import."""
+    table = {}
+    for command, keywords in COMMAND_ALIASES.items():
+        states = COMMAND_STATES[command] or GAME_STATES
+        for keyword in keywords:
+            for state in states:
+                table[(keyword, state)] = command
+    return table
+
+COMMAND_TABLE = _build_command_table()
+
+
+def looks_like_command(message):
+    """Cheap pre-check shared by every chat path: could `message` hold a command at all?"""
+    return '!' in message or '！' in message
+
+
+_PARSE_SECONDS = METRICS.series("monopoly_parse_seconds")
+_ACCEPTED = METRICS.series("monopoly_messages_total", result="command")
+_REJECTED = METRICS.series("monopoly_messages_total", result="rejected")
+
 
 def parse_command(message, player_name, game_state):
     """
     Parses a chat message to identify a game command.
+    Returns {"command", "player", "args"} or None if the message is not a
+    command that is allowed in the current game state.
     """
-    message = message.lower().strip()
-    # Basic command cleaning
-    message = re.sub(r'[^\w! ]', '', message) # Remove emojis/symbols
+    if not METRICS.enabled:
+        return _parse_command(message, player_name, game_state)
+    if not looks_like_command(message):
+        # Plain chatter is most of the traffic; count it without timing it
+        _REJECTED.inc()
+        return None
+    start = time.perf_counter()
+    result = _parse_command(message, player_name, game_state)
+    _PARSE_SECONDS.observe(time.perf_counter() - start)
+    (_ACCEPTED if result else _REJECTED).inc()
+    return result
 
-    if message == '!join' and game_state == "WAITING":
-        return {"command": "join", "player": player_name}
 
-    if message == '!start' and game_state == "WAITING":
-        return {"command": "start", "player": player_name}
+def _parse_command(message, player_name, game_state):
+    # Almost all chat is not a command; reject it before doing any work.
+    if not looks_like_command(message):
+        return None
 
-    if message == '!roll' and game_state == "IN_PROGRESS":
-        return {"command": "roll", "player": player_name}
-
-    if message == '!buy' and game_state == "IN_PROGRESS":
-        return {"command": "buy", "player": player_name}
-
-    if message == '!pass' and game_state == "IN_PROGRESS":
-        return {"command": "pass", "player": player_name}
-
-    if message == '!status':
-        return {"command": "status", "player": player_name}
+    message = message.replace('！', '!').lower().strip()
+    # Basic command cleaning
+    message = _SYMBOLS.sub('', message) # Remove emojis/symbols
 
-    if message == '!board':
-        return {"command": "board", "player": player_name}
+    parts = message.split()
+    if not parts or parts[0][:1] != '!':
+        return None
 
-    return None # No valid command found
+    command = COMMAND_TABLE.get((parts[0][1:], game_state))
+    if command is None:
+        return None # No valid command found
+    return {"command": command, "player": player_name, "args": parts[1:]}
@@ -11,5 +11,21 @@ SETTINGS = {
     "FREE_PARKING_BONUS": 50,
     "TURN_TIMEOUT_SECONDS": 30,
     "COMMAND_RATE_LIMIT_SECONDS": 2,
+    "MAX_ROOMS": 100,
+    "ROOM_IDLE_TIMEOUT_SECONDS": 3600,
+    "LOG_CAPACITY": 500, # Log entries kept in memory per game
+    "LOG_TAIL": 50, # Log entries sent with each game state
+    "LOG_SPILL_DIR": None, # If set, entries dropped from memory are appended to files here
+    "PERSISTENCE_DIR": None, # If set, games are journaled here and restored on startup
+    "SNAPSHOT_INTERVAL": 200, # Commands between full game snapshots
+    "JOURNAL_FSYNC_INTERVAL_SECONDS": 0.2,
+    "CROWD_VOTING": False, # Lets viewers who are not playing vote on the current player's move
+    "VOTE_WINDOW_SECONDS": 10,
+    "VOTE_MIN_VOTES": 1, # Votes needed for a window to decide the move
+    "STATS_DB_PATH": None, # If set, finished games and leaderboards are kept in this SQLite file
+    "METRICS_ENABLED": True, # Hot-path timings and counters, served at /metrics
+    "PROFILER_ALLOWED": False, # Allows starting the sampling profiler via /api/profiler
+    "STATE_STORE": None, # "memory", or a SQLite file shared by several server processes serving the same rooms
+    "STATE_POLL_INTERVAL_SECONDS": 0.05, # How often a process checks the SQLite store for other processes' saves
     # Add more settings as needed
 }
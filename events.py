@@ -0,0 +1,77 @@
+# monopoly/events.py
+import collections
+import itertools
+import json
+import threading
+
+from metrics import METRICS
+
+
+def format_sse(event_type, data):
+    """Formats a single Server-Sent Events message."""
+    return f"event: {event_type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class EventBus:
+    """
+    Fans game events out to any number of subscribers.
+
+    Each event is serialized once when published and kept in a bounded buffer.
+    Subscribers only hold the id of the last event they have seen, so the cost
+    of publishing does not grow with the number of subscribers.
+    """
+    def __init__(self, capacity=256):
+        self._events = collections.deque(maxlen=capacity)
+        self._last_id = 0
+        self._condition = threading.Condition()
+        self._listeners = []
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def add_listener(self, callback):
+        """Calls `callback()` after every publish, e.g. to wake async subscribers."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def publish(self, event_type, data):
+        with self._condition:
+            self._last_id += 1
+            message = format_sse(event_type, data)
+            self._events.append((self._last_id, message))
+            self._condition.notify_all()
+            event_id = self._last_id
+        for callback in self._listeners:
+            callback()
+        METRICS.observe("monopoly_state_payload_bytes", len(message), kind="event")
+        return event_id
+
+    def events_after(self, event_id):
+        """
+        Returns (messages, last_id) for every event newer than `event_id`.
+        `messages` is None if the subscriber fell behind the buffer and must resync.
+        """
+        with self._condition:
+            return self._collect(event_id)
+
+    def wait(self, event_id, timeout=None):
+        """Like events_after, but blocks up to `timeout` seconds for a new event."""
+        with self._condition:
+            if self._last_id <= event_id:
+                self._condition.wait(timeout)
+            return self._collect(event_id)
+
+    def _collect(self, event_id):
+        if event_id >= self._last_id:
+            return [], self._last_id
+        if not self._events or self._events[0][0] > event_id + 1:
+            return None, self._last_id
+        # Events are stored in id order, so the newest ones sit at the end.
+        skip = len(self._events) - (self._last_id - event_id)
+        messages = [message for _, message in itertools.islice(self._events, skip, None)]
+        return messages, self._last_id
+
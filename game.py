@@ -1,98 +1,459 @@
+import bisect
+import itertools
 import random
+import uuid
+import time
 from player import Player
-from board import Board, Property
+from board import Board, Property, PropertyDef, Space, TEMPLATES, get_template
+from game_log import GameLog
+from metrics import METRICS
+
+# Shared across games so a version from a replaced game is never mistaken
+# for a version of the current one.
+_state_versions = itertools.count(1)
+
+# A version is only meaningful to the game instance that handed it out. Its
+# high bits hold a random epoch per instance, so a `since` from another
+# instance, e.g. one in another server process, falls outside this game's
+# range and gets a full state. Versions stay below 2**53 for JavaScript.
+VERSION_EPOCH_SHIFT = 32
+_epochs = random.SystemRandom()
+
+def _new_epoch():
+    return _epochs.randrange(1, 2 ** 21) << VERSION_EPOCH_SHIFT
 
 class Game:
-    def __init__(self, config, game_options=None):
+    def __init__(self, config, game_options=None, event_bus=None):
         self.config = config
+        self.event_bus = event_bus
         self.game_options = game_options if game_options else {}
 
+        # Tells games apart even when they were started from the same seed
+        self.game_id = uuid.uuid4().hex
+
         board_size = self.game_options.get("board_size", 12)
         image_urls = self.game_options.get("image_urls", {})
 
-        self.board = Board(num_spaces=board_size, image_urls=image_urls)
+        # The seed picks the (cached) board template and seeds `self.rng`, which
+        # drives every roll, so a game can be reproduced from its seed and the
+        # commands sent to it.
+        self.seed = self.game_options.get("seed")
+        if self.seed is None:
+            self.seed = random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        # Headless games (simulations) skip building log messages entirely.
+        self.log_enabled = self.game_options.get("log_enabled", True)
+
+        template_name = self.game_options.get("template")
+        if template_name is not None:
+            if template_name not in TEMPLATES:
+                raise ValueError(f"Unknown board template: {template_name!r}")
+            template = TEMPLATES[template_name]
+        else:
+            template = get_template(board_size, self.seed)
+        self.board = Board(image_urls=image_urls, template=template)
+        if self.game_options.get("auto_price"):
+            # Imported here so NumPy is only needed by games that ask for it
+            import analytics
+            analytics.auto_price(self.board)
         self.players = []
+        self.turns_played = 0
         self.current_turn_index = 0
         self.game_state = "WAITING"
         self.player_map = {}
         self.pending_action = None
-        self.log = [f"Game created with a {board_size}-space board. Waiting for players to join."]
+        # Results of bankrupt players, in the order they went out
+        self.eliminated = []
+        self.log = GameLog(capacity=self.config.get('LOG_CAPACITY', 500),
+                           spill_path=self.game_options.get("log_spill_path"))
+        # Only the newest entries are sent with the state; older ones are paged via the log API.
+        self.log_tail = self.config.get('LOG_TAIL', 50)
+
+        # State versioning: every mutation bumps `version`; the serialized
+        # snapshot is rebuilt lazily and only when the version has moved.
+        self._epoch = _new_epoch()
+        self.version = self._epoch + next(_state_versions)
+        self._base_version = self.version
+        self.log.append(f"Game created with a {self.board.size}-space board. Waiting for players to join.", self.version)
+        self._space_versions = [self.version] * self.board.size
+        self._player_versions = {}
+        # (version, position) per space change, oldest first, so a delta finds
+        # the spaces changed since a version without scanning the board
+        self._space_changes = []
+        # Names of players whose get_state() may have changed since the last build
+        self._changed_players = set()
+        self._snapshot = None
+        self._snapshot_version = None
+        self._delta_cache = {}
+
+        # Changes are pushed to the event bus once per command, not per log line.
+        self._in_command = False
+        self._published_version = self.version
+        # Set by a room that publishes only once a command is saved to a shared store
+        self.hold_events = False
 
-    def _add_log(self, message):
-        self.log.append(message)
+    def _touch(self):
+        self.version = self._epoch + next(_state_versions)
+
+    def _add_log(self, message, *args):
+        """Adds a log line. `message` is only formatted with `args` when logging is enabled."""
+        self._touch()
+        if not self.log_enabled:
+            return
+        self.log.append(message.format(*args) if args else message, self.version)
+        if not self._in_command:
+            self._publish_changes()
+
+    def _publish_changes(self):
+        """Publishes everything that changed since the last publish as one state event."""
+        if self.event_bus is None or self.hold_events or self._published_version == self.version:
+            return
+        update = self.get_state(since=self._published_version)
+        self._published_version = self.version
+        if update is not None:
+            self.event_bus.publish("state", update)
 
     def get_and_clear_log(self):
-        log_copy = self.log[:]
-        self.log = []
+        log_copy = self.log.messages()
+        self.log.clear()
+        self._touch()
         return log_copy
 
-    def get_state(self):
-        """Returns the entire game state as a dictionary."""
-        safe_pending_action = None
-        if self.pending_action:
-            safe_pending_action = self.pending_action
+    def _serialize_space(self, space):
+        space_dict = {
+            "name": space.name,
+            "type": space.space_type
+        }
+        if isinstance(space, Property):
+            space_dict.update({
+                "color": space.color,
+                "price": space.price,
+                "rent": space.rent,
+                "owner": space.owner.name if space.owner else None
+            })
+        return space_dict
 
-        board_state = []
-        for space in self.board.spaces:
-            space_dict = {
-                "name": space.name,
-                "type": space.space_type,
-                "image_url": space.image_url
+    def _refresh_snapshot(self):
+        """
+        Rebuilds the cached full state if anything changed since the last build.
+        Only the spaces and players recorded as changed (board.changed_positions,
+        _changed_players) are serialized again; the rest are reused.
+        """
+        if self._snapshot is not None and self._snapshot_version == self.version:
+            return self._snapshot
+
+        previous = self._snapshot
+        changed_positions = self.board.changed_positions
+        changed_players = self._changed_players
+        if previous is None:
+            board_state = [self._serialize_space(space) for space in self.board.spaces]
+            player_states = [p.get_state() for p in self.players]
+            for state in player_states:
+                self._player_versions[state["name"]] = self.version
+        else:
+            board_state = previous["board"]
+            if changed_positions:
+                board_state = list(board_state)
+                for pos in sorted(changed_positions):
+                    board_state[pos] = self._serialize_space(self.board.spaces[pos])
+                    self._space_versions[pos] = self.version
+                    self._space_changes.append((self.version, pos))
+                if len(self._space_changes) > 2 * len(board_state):
+                    # Keep only each space's latest change
+                    self._space_changes = sorted((v, pos) for pos, v in enumerate(self._space_versions)
+                                                 if v > self._base_version)
+            old_players = {state["name"]: state for state in previous["players"]}
+            player_states = []
+            for p in self.players:
+                state = old_players.get(p.name)
+                if state is None or p.name in changed_players:
+                    state = p.get_state()
+                    self._player_versions[p.name] = self.version
+                player_states.append(state)
+        changed_positions.clear()
+        changed_players.clear()
+
+        current_player = self.get_current_player()
+        self._snapshot = {
+            "version": self.version,
+            "gameState": self.game_state,
+            "players": player_states,
+            "board": board_state,
+            "images": {space_type: url for space_type, url in self.board.image_urls.items() if url},
+            "currentPlayerName": current_player.name if self.game_state == "IN_PROGRESS" and current_player else None,
+            "pendingAction": dict(self.pending_action) if self.pending_action else None,
+            "log": self.log.messages(self.log.tail_start(self.log_tail)),
+            "logStart": self.log.tail_start(self.log_tail)
+        }
+        self._snapshot_version = self.version
+        self._delta_cache = {}
+        return self._snapshot
+
+    def has_version(self, version):
+        """True if this game instance handed out `version`, so a delta can be built from it."""
+        return self._base_version <= version <= self.version
+
+    @METRICS.timed("monopoly_get_state_seconds")
+    def get_state(self, since=None):
+        """
+        Returns the game state as a dictionary.
+
+        Without `since` (or with a version this game cannot diff against) the
+        full state is returned. With `since` set to a version previously handed
+        out, only the spaces, players and log entries that changed after it are
+        returned. Returns None when nothing changed since that version.
+        """
+        snapshot = self._refresh_snapshot()
+        if since is None or not self.has_version(since):
+            return snapshot
+        if since == self.version:
+            return None
+
+        delta = self._delta_cache.get(since)
+        if delta is None:
+            log_start = max(self.log.first_seq_after_version(since), self.log.tail_start(self.log_tail))
+            delta = {
+                "version": self.version,
+                "since": since,
+                "gameState": snapshot["gameState"],
+                "currentPlayerName": snapshot["currentPlayerName"],
+                "pendingAction": snapshot["pendingAction"],
+                "playerOrder": [p["name"] for p in snapshot["players"]],
+                "players": [p for p in snapshot["players"] if self._player_versions.get(p["name"], 0) > since],
+                "spaces": self._spaces_since(snapshot["board"], since),
+                "log": self.log.messages(log_start),
+                "logStart": log_start
             }
+            self._delta_cache[since] = delta
+        return delta
+
+    def _spaces_since(self, board_state, since):
+        """The serialized spaces changed after `since`, by position."""
+        first = bisect.bisect_right(self._space_changes, (since, len(board_state)))
+        positions = sorted({pos for _, pos in self._space_changes[first:]})
+        return {pos: board_state[pos] for pos in positions}
+
+    def to_snapshot(self):
+        """Returns a JSON-serializable snapshot of everything needed to resume the game."""
+        spaces = []
+        for space in self.board.spaces:
+            entry = {"name": space.name, "type": space.space_type}
             if isinstance(space, Property):
-                space_dict.update({
+                entry.update({
                     "color": space.color,
                     "price": space.price,
                     "rent": space.rent,
-                    "owner": space.owner.name if space.owner else None
+                    "owner": space.owner.name if space.owner else None,
+                    "rentCollected": space.rent_collected
                 })
-            board_state.append(space_dict)
-
+            spaces.append(entry)
+        positions = {id(space): i for i, space in enumerate(self.board.spaces)}
+        players = [{
+            "name": p.name,
+            "money": p.money,
+            "position": p.position,
+            "properties": [positions[id(prop)] for prop in p.properties],
+            "isInJail": p.is_in_jail,
+            "jailTurns": p.jail_turns,
+            "isBankrupt": p.is_bankrupt,
+            "rentCollected": p.rent_collected
+        } for p in self.players]
+        rng_version, rng_internal, rng_gauss = self.rng.getstate()
+        tail_start = self.log.tail_start(self.log_tail)
         return {
+            "options": {k: v for k, v in self.game_options.items() if k != "log_spill_path"},
+            "gameId": self.game_id,
+            "seed": self.seed,
+            "rng": [rng_version, list(rng_internal), rng_gauss],
+            "spaces": spaces,
+            "players": players,
+            "currentTurnIndex": self.current_turn_index,
             "gameState": self.game_state,
-            "players": [p.get_state() for p in self.players],
-            "board": board_state,
-            "currentPlayerName": self.get_current_player().name if self.game_state == "IN_PROGRESS" and self.get_current_player() else None,
-            "pendingAction": safe_pending_action,
-            "log": self.log
+            "pendingAction": self.pending_action,
+            "turnsPlayed": self.turns_played,
+            "eliminated": self.eliminated,
+            "log": {"start": tail_start, "messages": self.log.messages(tail_start)}
         }
 
+    @classmethod
+    def from_snapshot(cls, config, snapshot, event_bus=None, game_options=None):
+        """Rebuilds a game from to_snapshot() output. `game_options` are added to the saved ones."""
+        options = dict(snapshot["options"], **(game_options or {}))
+        options.update({"seed": snapshot["seed"], "board_size": len(snapshot["spaces"])})
+        options.pop("auto_price", None) # Prices come from the snapshot
+        game = cls(config, options, event_bus)
+        game.game_options = dict(snapshot["options"], **(game_options or {}))
+        game.game_id = snapshot.get("gameId", game.game_id)
+
+        spaces = []
+        for pos, entry in enumerate(snapshot["spaces"]):
+            if entry["type"] == "PROPERTY":
+                space = Property(PropertyDef(entry["name"], entry["color"], entry["price"], entry["rent"]))
+                space.rent_collected = entry["rentCollected"]
+            else:
+                # Reuse the template's shared space when it is the same square
+                space = game.board.spaces[pos]
+                if space.space_type != entry["type"] or space.name != entry["name"]:
+                    space = Space(entry["name"], entry["type"])
+            spaces.append(space)
+        game.board.set_spaces(spaces)
+
+        for entry in snapshot["players"]:
+            player = game._new_player(entry["name"], entry["money"])
+            player.position = entry["position"]
+            player.is_in_jail = entry["isInJail"]
+            player.jail_turns = entry["jailTurns"]
+            player.is_bankrupt = entry["isBankrupt"]
+            player.rent_collected = entry.get("rentCollected", 0)
+            for pos in entry["properties"]:
+                player.add_property(spaces[pos])
+            game.players.append(player)
+            game.player_map[player.name] = player
+
+        game.current_turn_index = snapshot["currentTurnIndex"]
+        game.game_state = snapshot["gameState"]
+        game.pending_action = snapshot["pendingAction"]
+        game.turns_played = snapshot["turnsPlayed"]
+        game.eliminated = snapshot.get("eliminated", [])
+        rng_version, rng_internal, rng_gauss = snapshot["rng"]
+        game.rng.setstate((rng_version, tuple(rng_internal), rng_gauss))
+
+        log = snapshot["log"]
+        game.log.first_seq = game.log.next_seq = log["start"]
+        for message in log["messages"]:
+            game.log.append(message, game.version)
+        game._touch()
+        return game
+
+    def apply_snapshot(self, snapshot):
+        """
+        Brings this game up to a later to_snapshot() of the same game in place,
+        e.g. one saved by another server process. Versions handed out earlier
+        stay valid, so readers get a delta. Returns False, changing nothing, if
+        the snapshot is of another game or older than this game's log.
+        """
+        log = snapshot["log"]
+        start, messages = log["start"], log["messages"]
+        if (snapshot.get("gameId") != self.game_id or len(snapshot["spaces"]) != len(self.board.spaces)
+                or self.log.next_seq > start + len(messages)):
+            return False
+        for space, entry in zip(self.board.spaces, snapshot["spaces"]):
+            if space.name != entry["name"] or space.space_type != entry["type"]:
+                return False
+
+        players = []
+        owners = {}
+        for entry in snapshot["players"]:
+            player = self.player_map.get(entry["name"]) or self._new_player(entry["name"], entry["money"])
+            before = player.get_state()
+            player.money = entry["money"]
+            player.position = entry["position"]
+            player.is_in_jail = entry["isInJail"]
+            player.jail_turns = entry["jailTurns"]
+            player.is_bankrupt = entry["isBankrupt"]
+            player.rent_collected = entry.get("rentCollected", 0)
+            player.properties = [self.board.spaces[pos] for pos in entry["properties"]]
+            player.color_counts = {}
+            for pos, prop in zip(entry["properties"], player.properties):
+                player.color_counts[prop.color] = player.color_counts.get(prop.color, 0) + 1
+                owners[pos] = player
+            if player.get_state() != before:
+                player.mark_changed()
+            players.append(player)
+        # Owners are set once each, so only spaces that changed hands are recorded
+        for pos, (space, entry) in enumerate(zip(self.board.spaces, snapshot["spaces"])):
+            if isinstance(space, Property):
+                space.owner = owners.get(pos)
+                space.rent_collected = entry["rentCollected"]
+        self.players = players
+        self.player_map = {player.name: player for player in players}
+
+        self.current_turn_index = snapshot["currentTurnIndex"]
+        self.game_state = snapshot["gameState"]
+        self.pending_action = snapshot["pendingAction"]
+        self.turns_played = snapshot["turnsPlayed"]
+        self.eliminated = snapshot.get("eliminated", [])
+        rng_version, rng_internal, rng_gauss = snapshot["rng"]
+        self.rng.setstate((rng_version, tuple(rng_internal), rng_gauss))
+
+        self._touch()
+        if start > self.log.next_seq:
+            # More happened than the snapshot's log tail holds; continue the log from the tail
+            self.log.first_seq = self.log.next_seq = start
+        for message in messages[self.log.next_seq - start:]:
+            self.log.append(message, self.version)
+        self._publish_changes()
+        return True
+
     def run_command(self, command, player_name, args=None):
-        # ... (rest of the command handling logic remains the same)
-        if command == "join": self._add_player(player_name)
-        elif command == "start": self._start_game()
-        elif command == "roll": self._handle_roll(player_name)
-        elif command == "buy": self._handle_buy(player_name)
-        elif command == "pass": self._handle_pass(player_name)
-        elif command == "status": self._handle_status(player_name)
-        else: self._add_log(f"Unknown command: {command}")
-
-    def _start_game(self):
+        self._in_command = True
+        try:
+            self._dispatch_command(command, player_name, args)
+            self._touch()
+        finally:
+            self._in_command = False
+        self._publish_changes()
+
+    def _dispatch_command(self, command, player_name, args=None):
+        handler = self.COMMAND_HANDLERS.get(command)
+        if handler is None:
+            self._add_log("Unknown command: {}", command)
+            return
+        if not METRICS.enabled:
+            handler(self, player_name)
+            return
+        start = time.perf_counter()
+        handler(self, player_name)
+        METRICS.observe("monopoly_command_seconds", time.perf_counter() - start, command=command)
+
+    def _start_game(self, player_name=None):
         min_players = self.config.get('MIN_PLAYERS', 2)
         if len(self.players) >= min_players:
             self.game_state = "IN_PROGRESS"
-            random.shuffle(self.players)
+            self.rng.shuffle(self.players)
             player_order = ", ".join([p.name for p in self.players])
-            self._add_log(f"The game has started! Player order: {player_order}")
-            self._add_log(f"It's {self.get_current_player().name}'s turn.")
+            self._add_log("The game has started! Player order: {}", player_order)
+            self._add_log("It's {}'s turn.", self.get_current_player().name)
         else:
-            self._add_log(f"Need at least {min_players} players to start.")
+            self._add_log("Need at least {} players to start.", min_players)
+
+    def _new_player(self, name, money):
+        """A Player whose changes are recorded for the next state update."""
+        player = Player(name, money)
+        player.changes = self._changed_players
+        player.mark_changed()
+        return player
 
     def _add_player(self, player_name):
         if self.game_state != "WAITING":
             self._add_log("Cannot join a game that is already in progress.")
             return
         if player_name in self.player_map:
-            self._add_log(f"Player {player_name} is already in the game.")
+            self._add_log("Player {} is already in the game.", player_name)
             return
         max_players = self.config.get('MAX_PLAYERS', 8)
         if len(self.players) >= max_players:
-            self._add_log(f"The game is full. Cannot add more than {max_players} players.")
+            self._add_log("The game is full. Cannot add more than {} players.", max_players)
             return
-        new_player = Player(player_name, self.config.get('STARTING_MONEY', 1500))
+        new_player = self._new_player(player_name, self.config.get('STARTING_MONEY', 1500))
         self.players.append(new_player)
         self.player_map[player_name] = new_player
-        self._add_log(f"Player {player_name} has joined the game. Total players: {len(self.players)}")
+        self._add_log("Player {} has joined the game. Total players: {}", player_name, len(self.players))
+
+    def turn_key(self):
+        """
+        Identifies the move the game is waiting for: whose it is and whether it
+        is a roll or a buy/pass decision. Changes as soon as that move is made.
+        None when no move is expected.
+        """
+        if self.game_state != "IN_PROGRESS":
+            return None
+        if self.pending_action:
+            return (self._base_version, self.turns_played, self.pending_action["player"], self.pending_action["action"])
+        current_player = self.get_current_player()
+        if current_player is None:
+            return None
+        return (self._base_version, self.turns_played, current_player.name, "roll")
 
     def next_turn(self):
         if not self.players:
@@ -106,70 +467,73 @@ class Game:
         return self.players[self.current_turn_index]
 
     def _end_turn(self):
+        self.turns_played += 1
         self.next_turn()
         if self.game_state != "FINISHED":
             next_player = self.get_current_player()
-            self._add_log(f"\nIt's now {next_player.name}'s turn.")
+            self._add_log("\nIt's now {}'s turn.", next_player.name)
 
     def _handle_roll(self, player_name):
         if self.game_state != "IN_PROGRESS":
             self._add_log("The game has not started yet."); return
         if self.pending_action:
-            self._add_log(f"There is a pending action for {self.pending_action['player']}. Please resolve it with !buy or !pass."); return
+            self._add_log("There is a pending action for {}. Please resolve it with !buy or !pass.", self.pending_action['player']); return
         current_player = self.get_current_player()
         if not current_player or current_player.name != player_name:
-            self._add_log(f"It's not your turn, {player_name}. It's {current_player.name}'s turn."); return
-        die1 = random.randint(1, 6); die2 = random.randint(1, 6)
+            self._add_log("It's not your turn, {}. It's {}'s turn.", player_name, current_player.name); return
+        die1 = self.rng.randint(1, 6); die2 = self.rng.randint(1, 6)
         total_roll = die1 + die2
-        self._add_log(f"{current_player.name} rolled a {die1} + {die2} = {total_roll}.")
+        self._add_log("{} rolled a {} + {} = {}.", current_player.name, die1, die2, total_roll)
         if current_player.move(total_roll, self.board.size):
             go_money = self.config.get('PASS_GO_MONEY', 200)
             current_player.receive(go_money)
-            self._add_log(f"{current_player.name} passed GO and collected ${go_money}.")
+            self._add_log("{} passed GO and collected ${}.", current_player.name, go_money)
         new_space = self.board.get_space(current_player.position)
-        self._add_log(f"{current_player.name} landed on {new_space.name}.")
+        self._add_log("{} landed on {}.", current_player.name, new_space.name)
         self._resolve_space_action(current_player, new_space)
         if not self.pending_action:
-            state = current_player.get_state()
-            self._add_log(f"Status: Player: {state['name']}, Money: ${state['money']}, Properties: {len(state['properties'])}")
+            self._add_log("Status: Player: {}, Money: ${}, Properties: {}", current_player.name, current_player.money, len(current_player.properties))
             self._end_turn()
 
+    @METRICS.timed("monopoly_space_action_seconds")
     def _resolve_space_action(self, player, space):
         space_type = space.space_type
         if space_type == "GO_TO_JAIL":
-            self._add_log(f"Oh no! {player.name} is sent to Jail!")
-            player.position = self.board.jail_pos
+            self._add_log("Oh no! {} is sent to Jail!", player.name)
+            player.go_to(self.board.jail_pos)
             # Add actual jail logic later if needed (e.g., skipping turns)
         elif space_type == "PROPERTY":
             if space.owner is None:
-                self._add_log(f"This property is unowned. You can buy it for ${space.price}.")
-                self._add_log(f"Type '{player.name}:!buy' or '{player.name}:!pass'.")
+                self._add_log("This property is unowned. You can buy it for ${}.", space.price)
+                self._add_log("Type '{}:!buy' or '{}:!pass'.", player.name, player.name)
                 self.pending_action = {"player": player.name, "action": "buy_or_pass", "space_pos": player.position}
             elif space.owner != player:
                 owner = space.owner
                 rent = space.rent
                 color_set = self.board.color_map.get(space.color)
-                if color_set and owner.owns_all_properties_in_set(color_set):
+                if color_set and owner.owns_color_set(space.color, len(color_set)):
                     rent *= 2
-                    self._add_log(f"!!! {owner.name} owns all {space.color} properties. Rent is DOUBLED!")
-                self._add_log(f"This property is owned by {owner.name}. You owe ${rent} in rent.")
+                    self._add_log("!!! {} owns all {} properties. Rent is DOUBLED!", owner.name, space.color)
+                self._add_log("This property is owned by {}. You owe ${} in rent.", owner.name, rent)
                 if not player.pay(rent): self._handle_bankruptcy(player)
-                else: owner.receive(rent); self._add_log(f"{player.name} paid ${rent} to {owner.name}.")
+                else:
+                    owner.receive(rent); space.rent_collected += rent; owner.rent_collected += rent
+                    self._add_log("{} paid ${} to {}.", player.name, rent, owner.name)
         elif space_type == "TAX":
             tax_amount = self.config.get('TAX_AMOUNT', 100)
-            self._add_log(f"You landed on a Tax space. You must pay ${tax_amount}.")
+            self._add_log("You landed on a Tax space. You must pay ${}.", tax_amount)
             if not player.pay(tax_amount): self._handle_bankruptcy(player)
         elif space_type == "FREE_PARKING":
             bonus = self.config.get('FREE_PARKING_BONUS', 50)
-            self._add_log(f"You landed on Free Parking! You collect a bonus of ${bonus}.")
+            self._add_log("You landed on Free Parking! You collect a bonus of ${}.", bonus)
             player.receive(bonus)
         elif space_type == "CHANCE":
-            outcome = random.choice([-50, 20, 50, 100])
-            if outcome > 0: self._add_log(f"Chance! You found ${outcome}."); player.receive(outcome)
-            else: self._add_log(f"Chance! You lost ${abs(outcome)}.");
+            outcome = self.rng.choice([-50, 20, 50, 100])
+            if outcome > 0: self._add_log("Chance! You found ${}.", outcome); player.receive(outcome)
+            else: self._add_log("Chance! You lost ${}.", abs(outcome));
             if not player.pay(abs(outcome)): self._handle_bankruptcy(player)
         else:
-            self._add_log(f"Landed on {space.name}. No special action.")
+            self._add_log("Landed on {}. No special action.", space.name)
 
     def _handle_buy(self, player_name):
         if not self.pending_action or self.pending_action["player"] != player_name:
@@ -177,18 +541,17 @@ class Game:
         player = self.player_map[player_name]
         space_to_buy = self.board.get_space(self.pending_action["space_pos"])
         if player.buy_property(space_to_buy):
-            self._add_log(f"{player.name} has bought {space_to_buy.name} for ${space_to_buy.price}!")
+            self._add_log("{} has bought {} for ${}!", player.name, space_to_buy.name, space_to_buy.price)
         else:
-            self._add_log(f"{player.name} does not have enough money.")
+            self._add_log("{} does not have enough money.", player.name)
         self.pending_action = None
-        state = player.get_state()
-        self._add_log(f"Status: Player: {state['name']}, Money: ${state['money']}")
+        self._add_log("Status: Player: {}, Money: ${}", player.name, player.money)
         self._end_turn()
 
     def _handle_pass(self, player_name):
         if not self.pending_action or self.pending_action["player"] != player_name:
             self._add_log("It's not your turn to pass."); return
-        self._add_log(f"{player_name} decided not to buy the property.")
+        self._add_log("{} decided not to buy the property.", player_name)
         self.pending_action = None
         self._end_turn()
 
@@ -197,28 +560,48 @@ class Game:
             player = self.player_map[player_name]
             state = player.get_state()
             prop_list = ', '.join(state['properties']) or 'None'
-            self._add_log(f"Status for {state['name']}: Money: ${state['money']}, Properties: {prop_list}")
+            self._add_log("Status for {}: Money: ${}, Properties: {}", state['name'], state['money'], prop_list)
         else:
-            self._add_log(f"Player {player_name} not found in the game.")
+            self._add_log("Player {} not found in the game.", player_name)
+
+    def _handle_board(self, player_name):
+        self._add_log(self.board.display())
+
+    def _player_result(self, player):
+        return {
+            "name": player.name,
+            "money": player.money,
+            "rentCollected": player.rent_collected,
+            "properties": len(player.properties),
+            "colors": dict(player.color_counts),
+        }
+
+    def results(self):
+        """
+        Every player's outcome, best first: players still in the game by money,
+        then the bankrupt ones, last to go out first.
+        """
+        standing = sorted((self._player_result(p) for p in self.players), key=lambda r: -r["money"])
+        return standing + self.eliminated[::-1]
 
     def _check_game_over(self):
         if len(self.players) <= 1:
             self.game_state = "FINISHED"
             if self.players:
                 winner = self.players[0]
-                state = winner.get_state()
-                self._add_log(f"\n--- GAME OVER ---")
-                self._add_log(f"The winner is {state['name']}!")
+                self._add_log("\n--- GAME OVER ---")
+                self._add_log("The winner is {}!", winner.name)
             else:
-                self._add_log(f"\n--- GAME OVER ---")
+                self._add_log("\n--- GAME OVER ---")
                 self._add_log("All players went bankrupt!")
             return True
         return False
 
     def _handle_bankruptcy(self, player):
-        self._add_log(f"--- {player.name} is bankrupt! ---")
-        for prop in player.properties: prop.owner = None
-        self._add_log(f"All properties of {player.name} are now back on the market.")
+        self._add_log("--- {} is bankrupt! ---", player.name)
+        self.eliminated.append(self._player_result(player))
+        player.release_properties()
+        self._add_log("All properties of {} are now back on the market.", player.name)
         del self.player_map[player.name]
         bankrupt_player_index = self.players.index(player)
         self.players.remove(player)
@@ -227,3 +610,14 @@ class Game:
         if self.current_turn_index >= len(self.players): self.current_turn_index = 0
         if not self._check_game_over():
              self.current_turn_index = (self.current_turn_index - 1 + len(self.players)) % len(self.players)
+
+    # Command name -> handler, looked up once per command instead of an if/elif chain
+    COMMAND_HANDLERS = {
+        "join": _add_player,
+        "start": _start_game,
+        "roll": _handle_roll,
+        "buy": _handle_buy,
+        "pass": _handle_pass,
+        "status": _handle_status,
+        "board": _handle_board,
+    }
@@ -0,0 +1,87 @@
+# monopoly/game_log.py
+import json
+
+
+class GameLog:
+    """
+    Fixed-capacity game log backed by a ring buffer.
+
+    Every entry gets a sequence number that keeps counting up for the life of
+    the game, so clients can page through the log with a cursor even after
+    old entries have been dropped. If `spill_path` is set, dropped entries are
+    appended to that file instead of being lost.
+    """
+    def __init__(self, capacity=500, spill_path=None):
+        if capacity < 1:
+            raise ValueError("Log capacity must be at least 1.")
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self._messages = [None] * capacity
+        self._versions = [0] * capacity
+        self._spill_file = None
+        self.first_seq = 0
+        self.next_seq = 0
+
+    def __len__(self):
+        return self.next_seq - self.first_seq
+
+    def __iter__(self):
+        return iter(self.messages())
+
+    def append(self, message, version=0):
+        slot = self.next_seq % self.capacity
+        if len(self) == self.capacity:
+            self._spill(self.first_seq, self._messages[slot])
+            self.first_seq += 1
+        self._messages[slot] = message
+        self._versions[slot] = version
+        self.next_seq += 1
+        return self.next_seq - 1
+
+    def truncate(self, seq):
+        """Drops the entries from `seq` on, e.g. those of a command that is being undone."""
+        self.next_seq = max(min(seq, self.next_seq), self.first_seq)
+
+    def clear(self):
+        """Drops every retained entry. Sequence numbers keep counting from where they were."""
+        self.first_seq = self.next_seq
+
+    def messages(self, start_seq=None, limit=None):
+        """Returns the retained messages from `start_seq` on, oldest first."""
+        start = self.first_seq if start_seq is None else max(start_seq, self.first_seq)
+        end = self.next_seq if limit is None else min(self.next_seq, start + limit)
+        return [self._messages[seq % self.capacity] for seq in range(start, end)]
+
+    def entries(self, after=None, limit=None):
+        """Returns [{"seq", "message"}] for entries newer than sequence number `after`."""
+        start = self.first_seq if after is None else max(after + 1, self.first_seq)
+        end = self.next_seq if limit is None else min(self.next_seq, start + limit)
+        return [{"seq": seq, "message": self._messages[seq % self.capacity]} for seq in range(start, end)]
+
+    def tail_start(self, count):
+        """Sequence number of the first of the last `count` entries."""
+        return max(self.first_seq, self.next_seq - count)
+
+    def first_seq_after_version(self, version):
+        """Sequence number of the first retained entry written after state `version`."""
+        low, high = self.first_seq, self.next_seq
+        while low < high:
+            mid = (low + high) // 2
+            if self._versions[mid % self.capacity] <= version:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def close(self):
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def _spill(self, seq, message):
+        if self.spill_path is None:
+            return
+        if self._spill_file is None:
+            self._spill_file = open(self.spill_path, "a", encoding="utf-8")
+        self._spill_file.write(json.dumps({"seq": seq, "message": message}) + "\n")
+        self._spill_file.flush()
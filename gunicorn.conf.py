@@ -0,0 +1,21 @@
+# Production runner for the async app: gunicorn -c gunicorn.conf.py asgi:app
+# Needs: pip install gunicorn uvicorn[standard]
+import os
+
+bind = os.environ.get("MONOPOLY_BIND", "0.0.0.0:5002")
+
+# Without a shared store, rooms live in the worker's memory and every request for
+# a room must reach the same process, so keep one worker. With STATE_STORE set in
+# config.py to a SQLite file, any number of workers serve the same rooms. Leave
+# PERSISTENCE_DIR unset then: each worker would write the same journal files.
+workers = int(os.environ.get("MONOPOLY_WORKERS", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Event streams stay open for the whole broadcast.
+keepalive = 75
+graceful_timeout = 10
+timeout = 60
+
+accesslog = None
+errorlog = "-"
+loglevel = os.environ.get("MONOPOLY_LOG_LEVEL", "warning")
@@ -0,0 +1,102 @@
+# monopoly/ingest.py
+import collections
+import threading
+import time
+
+from command_parser import looks_like_command, parse_command
+
+
+class ChatIngestor:
+    """
+    Batches chat messages for one room before they reach the game.
+
+    `submit` is cheap and does no game work: it drops messages that are not
+    commands, collapses a user's duplicate commands that are still queued and
+    enforces the per-user rate limit. `drain` then applies whatever is queued,
+    in arrival order, under the room lock. With crowd voting on, commands
+    from viewers who are not playing are counted as votes instead of queued.
+    """
+    def __init__(self, room, rate_limit_seconds=2, max_queue=10000):
+        self.room = room
+        self.rate_limit_seconds = rate_limit_seconds
+        self.max_queue = max_queue
+        self.counters = collections.Counter()
+        self.started_at = time.monotonic()
+        self._queue = collections.deque()
+        self._queued_keys = set()
+        self._last_command_at = {}
+        self._lock = threading.Lock()
+
+    def submit(self, messages):
+        """
+        Queues a batch of {"player": ..., "message": ...} dicts.
+        Returns the number of messages that were queued.
+        """
+        now = time.monotonic()
+        accepted = 0
+        voting = self.room.voting
+        game = self.room.game
+        with self._lock:
+            for item in messages:
+                self.counters["received"] += 1
+                player_name = item.get("player") if isinstance(item, dict) else None
+                message = item.get("message") if isinstance(item, dict) else None
+                if not player_name or not isinstance(message, str) or not looks_like_command(message):
+                    self.counters["noise"] += 1
+                    continue
+                if voting is not None and game.game_state == "IN_PROGRESS" and player_name not in game.player_map:
+                    # Spectators vote instead of queuing commands
+                    self.counters["voted" if voting.vote(player_name, message) else "vote_ignored"] += 1
+                    continue
+                key = (player_name, message.strip().lower())
+                if key in self._queued_keys:
+                    self.counters["duplicate"] += 1
+                    continue
+                last = self._last_command_at.get(player_name)
+                if last is not None and now - last < self.rate_limit_seconds:
+                    self.counters["rate_limited"] += 1
+                    continue
+                if len(self._queue) >= self.max_queue:
+                    self.counters["overflow"] += 1
+                    continue
+                self._last_command_at[player_name] = now
+                self._queued_keys.add(key)
+                self._queue.append((key, player_name, message))
+                accepted += 1
+            self.counters["queued"] += accepted
+            if len(self._last_command_at) > self.max_queue:
+                self._forget_idle_players(now)
+        return accepted
+
+    def drain(self):
+        """Applies every queued command to the room's game. Returns how many were applied."""
+        applied = 0
+        with self.room.lock:
+            while True:
+                with self._lock:
+                    if not self._queue:
+                        break
+                    key, player_name, message = self._queue.popleft()
+                    self._queued_keys.discard(key)
+                command_data = parse_command(message, player_name, self.room.game.game_state)
+                if command_data is None:
+                    self.counters["invalid"] += 1
+                    continue
+                self.room.run_command(command_data["command"], player_name, command_data.get("args"))
+                applied += 1
+        self.counters["applied"] += applied
+        return applied
+
+    def stats(self):
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        stats = dict(self.counters)
+        stats["queue_depth"] = len(self._queue)
+        stats["received_per_second"] = round(self.counters["received"] / elapsed, 2)
+        stats["applied_per_second"] = round(self.counters["applied"] / elapsed, 2)
+        return stats
+
+    def _forget_idle_players(self, now):
+        self._last_command_at = {
+            name: last for name, last in self._last_command_at.items()
+            if now - last < self.rate_limit_seconds
+        }
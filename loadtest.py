@@ -0,0 +1,223 @@
+# monopoly/loadtest.py
+"""
+Load generator that replays chat-like traffic against a running server and
+reports latency percentiles, throughput and the server's memory growth.
+
+Start a server first (`python app.py` or `uvicorn asgi:app --port 5002`), then:
+
+    python loadtest.py --duration 30 --clients 16 --server-pid <pid> --output run.json
+
+Each client thread keeps one connection open and mixes chat batches, single
+commands and state polls the way a busy stream does. Pass --server-pid to
+sample the server's resident memory (Linux only).
+"""
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+# What a busy chat looks like: mostly chatter, a few commands, lots of repeats.
+CHAT_LINES = [
+    ("lol", 20), ("gg", 10), ("who is winning?", 8), ("hello!", 6), ("this is so fun", 6),
+    ("!roll", 12), ("!buy", 6), ("!pass", 4), ("!status", 4), ("!join", 3), ("!tirar", 1), ("!ロール", 1),
+]
+
+# (request kind, weight) each client picks from
+REQUEST_MIX = [("chat", 50), ("command", 15), ("state_delta", 25), ("state_full", 5), ("log", 5)]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def read_rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+class Client:
+    """One simulated bridge connection; keeps its own latencies to avoid sharing a lock."""
+    def __init__(self, base_url, room, viewers, seed):
+        url = urlsplit(base_url)
+        self.host, self.port = url.hostname, url.port or 80
+        self.prefix = f"/api/{room}"
+        self.viewers = viewers
+        self.rng = random.Random(seed)
+        self.latencies = {}
+        self.errors = {}
+        self.version = None
+        self._connection = None
+        self._lines = [line for line, _ in CHAT_LINES]
+        self._line_weights = [weight for _, weight in CHAT_LINES]
+        self._kinds = [kind for kind, _ in REQUEST_MIX]
+        self._kind_weights = [weight for _, weight in REQUEST_MIX]
+
+    def request(self, method, path, body=None):
+        """Returns (status, body bytes); reconnects once if the server closed the connection."""
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        for attempt in (0, 1):
+            if self._connection is None:
+                self._connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self._connection.request(method, self.prefix + path, body=payload, headers=headers)
+                response = self._connection.getresponse()
+                data = response.read()
+                if response.getheader("connection", "").lower() == "close" or response.version == 10:
+                    self._close()
+                return response.status, data
+            except (http.client.HTTPException, OSError):
+                self._close()
+                if attempt:
+                    raise
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _message(self):
+        viewer = f"viewer{self.rng.randrange(self.viewers)}"
+        return {"player": viewer, "message": self.rng.choices(self._lines, self._line_weights)[0]}
+
+    def step(self):
+        kind = self.rng.choices(self._kinds, self._kind_weights)[0]
+        if kind == "chat":
+            args = ("POST", "/chat", {"messages": [self._message() for _ in range(self.rng.randint(1, 50))]})
+        elif kind == "command":
+            args = ("POST", "/command", self._message())
+        elif kind == "state_delta" and self.version is not None:
+            args = ("GET", f"/game_state?since={self.version}")
+        elif kind == "log":
+            args = ("GET", "/log?limit=50")
+        else:
+            kind, args = "state_full", ("GET", "/game_state")
+
+        start = time.perf_counter()
+        try:
+            status, data = self.request(*args)
+        except (http.client.HTTPException, OSError) as e:
+            self.errors[type(e).__name__] = self.errors.get(type(e).__name__, 0) + 1
+            return
+        self.latencies.setdefault(kind, []).append(time.perf_counter() - start)
+        if status >= 400:
+            self.errors[str(status)] = self.errors.get(str(status), 0) + 1
+        elif status == 200 and kind.startswith("state"):
+            self.version = json.loads(data).get("version", self.version)
+
+    def run(self, deadline):
+        while time.monotonic() < deadline:
+            self.step()
+        self._close()
+
+
+def prepare_game(client, board_size, players, seed):
+    """Starts a fresh game in the room with `players` viewers already joined."""
+    status, _ = client.request("POST", "/new_game", {"board_size": board_size, "seed": seed})
+    if status != 200:
+        raise SystemExit(f"Could not start a new game (HTTP {status}); is the server running?")
+    for i in range(players):
+        client.request("POST", "/command", {"player": f"viewer{i}", "message": "!join"})
+    client.request("POST", "/command", {"player": "viewer0", "message": "!start"})
+
+
+def run_load(base_url, room="loadtest", clients=8, duration=10.0, viewers=500, board_size=40,
+             players=6, server_pid=None, seed=0):
+    setup = Client(base_url, room, viewers, seed)
+    prepare_game(setup, board_size, players, seed)
+    setup._close()
+
+    memory = []
+    stop = threading.Event()
+    def sample_memory():
+        while True:
+            rss = read_rss_kb(server_pid)
+            if rss is not None:
+                memory.append(rss)
+            if stop.wait(0.5):
+                return
+    sampler = threading.Thread(target=sample_memory, daemon=True) if server_pid else None
+    if sampler:
+        sampler.start()
+
+    workers = [Client(base_url, room, viewers, seed + i + 1) for i in range(clients)]
+    deadline = time.monotonic() + duration
+    threads = [threading.Thread(target=worker.run, args=(deadline,)) for worker in workers]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    if sampler:
+        sampler.join()
+
+    latencies, errors = {}, {}
+    for worker in workers:
+        for kind, values in worker.latencies.items():
+            latencies.setdefault(kind, []).extend(values)
+        for key, count in worker.errors.items():
+            errors[key] = errors.get(key, 0) + count
+    all_latencies = sorted(value for values in latencies.values() for value in values)
+
+    def summary(values):
+        values = sorted(values)
+        return {
+            "requests": len(values),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+            "max_ms": round(values[-1] * 1000, 3),
+        }
+
+    report = {
+        "config": {"url": base_url, "room": room, "clients": clients, "duration": duration,
+                   "viewers": viewers, "board_size": board_size, "players": players, "seed": seed},
+        "requests": len(all_latencies),
+        "requests_per_second": round(len(all_latencies) / elapsed, 1),
+        "errors": errors,
+        "overall": summary(all_latencies) if all_latencies else None,
+        "by_kind": {kind: summary(values) for kind, values in sorted(latencies.items())},
+    }
+    if memory:
+        report["server_memory_kb"] = {"start": memory[0], "end": memory[-1], "peak": max(memory),
+                                      "growth": memory[-1] - memory[0]}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay chat-like traffic against a Mini Monopoly server.")
+    parser.add_argument("--url", default="http://127.0.0.1:5002")
+    parser.add_argument("--room", default="loadtest")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--viewers", type=int, default=500, help="distinct chat users")
+    parser.add_argument("--board-size", type=int, default=40)
+    parser.add_argument("--players", type=int, default=6, help="players joined before the run")
+    parser.add_argument("--server-pid", type=int, help="sample this process's memory during the run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = run_load(args.url, room=args.room, clients=args.clients, duration=args.duration,
+                      viewers=args.viewers, board_size=args.board_size, players=args.players,
+                      server_pid=args.server_pid, seed=args.seed)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+# monopoly/metrics.py
+"""
+Counters and timing histograms for the hot paths, rendered in the Prometheus
+text format at /metrics.
+
+Recording is a dict update under a lock. With METRICS_ENABLED set to False
+every recording call returns after a single attribute check.
+"""
+import bisect
+import functools
+import threading
+import time
+
+from config import SETTINGS
+
+# Upper bounds in seconds; most game work finishes well under a millisecond.
+TIME_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.25, 1.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+class Metrics:
+    """A small registry of counters and histograms keyed by name and labels."""
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._meta = {} # name -> (type, help, buckets)
+        self._counters = {}
+        self._histograms = {} # (name, labels) -> [count per bucket..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text):
+        self._meta[name] = ("counter", help_text, None)
+
+    def histogram(self, name, help_text, buckets=TIME_BUCKETS):
+        self._meta[name] = ("histogram", help_text, buckets)
+
+    def inc(self, name, amount=1, **labels):
+        if self.enabled:
+            self._inc((name, tuple(sorted(labels.items()))), amount)
+
+    def observe(self, name, value, **labels):
+        if self.enabled:
+            self._observe((name, tuple(sorted(labels.items()))), self._meta[name][2], value)
+
+    def series(self, name, **labels):
+        """A handle for one fixed label set, for call sites too hot to build the key each time."""
+        return _Series(self, name, labels)
+
+    def _inc(self, key, amount):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def _observe(self, key, buckets, value):
+        index = bisect.bisect_left(buckets, value)
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None:
+                series = self._histograms[key] = [0] * (len(buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def timed(self, name, **labels):
+        """Decorator recording how long each call takes in histogram `name`."""
+        series = self.series(name, **labels)
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    series.observe(time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self, families=()):
+        """
+        Returns every series in the Prometheus text format. `families` are extra
+        (name, type, help, [(labels dict, value), ...]) series read at scrape time.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(series) for key, series in self._histograms.items()}
+
+        by_name = {}
+        for (name, labels), value in counters.items():
+            by_name.setdefault(name, []).append((labels, value))
+        for (name, labels), series in histograms.items():
+            by_name.setdefault(name, []).append((labels, series))
+
+        lines = []
+        for name in sorted(by_name):
+            kind, help_text, buckets = self._meta.get(name, ("untyped", "", None))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(by_name[name]):
+                if kind != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + ("+Inf",), value):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {value[-1]}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        for name, kind, help_text, samples in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(sorted(labels.items()))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class _Series:
+    __slots__ = ("metrics", "key", "buckets")
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.key = (name, tuple(sorted(labels.items())))
+        self.buckets = metrics._meta[name][2]
+
+    def inc(self, amount=1):
+        if self.metrics.enabled:
+            self.metrics._inc(self.key, amount)
+
+    def observe(self, value):
+        if self.metrics.enabled:
+            self.metrics._observe(self.key, self.buckets, value)
+
+
+METRICS = Metrics(enabled=SETTINGS.get("METRICS_ENABLED", True))
+
+METRICS.histogram("monopoly_parse_seconds", "Time spent parsing one chat message.")
+METRICS.counter("monopoly_messages_total", "Chat messages parsed, by result (command or rejected).")
+METRICS.histogram("monopoly_command_seconds", "Time spent in each command handler, by command.")
+METRICS.histogram("monopoly_space_action_seconds", "Time spent resolving the space a player landed on.")
+METRICS.histogram("monopoly_get_state_seconds", "Time spent building a full or delta game state.")
+METRICS.histogram("monopoly_state_payload_bytes", "Size of serialized state payloads, by kind.", SIZE_BUCKETS)
+METRICS.histogram("monopoly_http_request_seconds", "HTTP request latency, by endpoint and status.")
+METRICS.counter("monopoly_state_conflicts_total", "Commands rerun because another worker saved the room first.")
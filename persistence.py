@@ -0,0 +1,142 @@
+# monopoly/persistence.py
+"""
+Crash recovery for games: periodic snapshots plus an append-only command journal.
+
+Every accepted command is appended to the journal together with a short
+outcome record, and the journal is fsynced in batches. Every
+`snapshot_interval` commands the whole game is written to a snapshot and the
+journal starts over, so recovery only replays a short journal tail on top of
+the latest snapshot.
+"""
+import json
+import os
+import time
+
+from game import Game
+
+SNAPSHOT_FILE = "snapshot.json"
+JOURNAL_FILE = "journal.jsonl"
+
+
+def command_outcome(game):
+    """A compact record of what a command left behind, used to verify replays."""
+    return [game.game_state, game.current_turn_index, [[p.name, p.position, p.money] for p in game.players]]
+
+
+class CommandJournal:
+    """Append-only JSON-lines file, fsynced every `fsync_batch` records or `fsync_interval` seconds."""
+    def __init__(self, path, fsync_batch=64, fsync_interval=0.2):
+        self.path = path
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self._file = open(path, "a", encoding="utf-8")
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    @property
+    def pending(self):
+        """Records written since the last fsync."""
+        return self._pending
+
+    def append(self, record):
+        self._file.write(json.dumps(record, separators=(',', ':')) + "\n")
+        # Handed to the OS right away, so a crashed process loses nothing; only the fsync is batched.
+        self._file.flush()
+        self._pending += 1
+        if self._pending >= self.fsync_batch or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        if self._file.closed:
+            return
+        self._file.flush()
+        if self._pending:
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def truncate(self):
+        self._file.truncate(0)
+        self._file.seek(0)
+        self._pending = 1 # Make the next sync fsync the truncation
+        self.sync()
+
+    def close(self):
+        self.sync()
+        self._file.close()
+
+    @staticmethod
+    def read(path):
+        """Yields the journal's records, ignoring a torn last line from a crash."""
+        if not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    return
+
+
+class GameStore:
+    """Snapshot and journal for the game of one room, kept in its own directory."""
+    def __init__(self, directory, snapshot_interval=200, fsync_interval=0.2):
+        self.directory = directory
+        self.snapshot_interval = snapshot_interval
+        os.makedirs(directory, exist_ok=True)
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self.journal = CommandJournal(os.path.join(directory, JOURNAL_FILE), fsync_interval=fsync_interval)
+        self.seq = 0
+        self._since_snapshot = 0
+
+    def record_command(self, game, command, player_name, args=None):
+        self.seq += 1
+        self.journal.append({
+            "seq": self.seq,
+            "command": command,
+            "player": player_name,
+            "args": args or [],
+            "outcome": command_outcome(game),
+        })
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_interval:
+            self.save_snapshot(game)
+
+    def save_snapshot(self, game):
+        """Writes the snapshot atomically, then starts the journal over."""
+        self.journal.sync()
+        snapshot = {"journalSeq": self.seq, "game": game.to_snapshot()}
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        # Records up to journalSeq are now in the snapshot; a crash before this
+        # truncation is harmless because recovery skips them by seq.
+        self.journal.truncate()
+        self._since_snapshot = 0
+
+    def load(self, config, event_bus=None, game_options=None):
+        """Restores the latest snapshot and replays the journal tail. Returns None if nothing is saved."""
+        if not os.path.exists(self.snapshot_path):
+            return None
+        with open(self.snapshot_path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+        game = Game.from_snapshot(config, snapshot["game"], event_bus=event_bus, game_options=game_options)
+        self.seq = snapshot["journalSeq"]
+
+        for record in CommandJournal.read(self.journal.path):
+            if record["seq"] <= self.seq:
+                continue
+            game.run_command(record["command"], record["player"], record["args"])
+            if command_outcome(game) != record["outcome"]:
+                print(f"--- Journal replay diverged at command {record['seq']} in {self.directory} ---")
+            self.seq = record["seq"]
+            self._since_snapshot += 1
+        return game
+
+    def close(self, game=None):
+        if game is not None:
+            self.save_snapshot(game)
+        self.journal.close()
@@ -1,6 +1,9 @@
 # monopoly/player.py
 
 class Player:
+    __slots__ = ("name", "money", "properties", "position", "is_in_jail", "jail_turns", "is_bankrupt", "color_counts",
+                 "rent_collected", "changes")
+
     def __init__(self, name, start_money):
         self.name = name
         self.money = start_money
@@ -9,17 +12,35 @@ class Player:
         self.is_in_jail = False
         self.jail_turns = 0
         self.is_bankrupt = False
+        # Number of owned properties per color, so color-set checks are O(1)
+        self.color_counts = {}
+        # Total rent received from other players, for the stats store
+        self.rent_collected = 0
+        # The game's set of changed player names; see mark_changed()
+        self.changes = None
+
+    def mark_changed(self):
+        """Records that get_state() may differ, so the next state update includes this player."""
+        if self.changes is not None:
+            self.changes.add(self.name)
 
     def move(self, steps, board_size):
         old_position = self.position
         self.position = (self.position + steps) % board_size
+        self.mark_changed()
 
         # Player passes GO if their new position is a smaller number than their old one
         # (unless they went backwards, which is not a feature yet)
         passed_go = self.position < old_position
         return passed_go
 
+    def go_to(self, position):
+        """Puts the player on `position` without passing GO, e.g. when sent to jail."""
+        self.position = position
+        self.mark_changed()
+
     def pay(self, amount):
+        self.mark_changed()
         if self.money >= amount:
             self.money -= amount
             return True
@@ -31,14 +52,28 @@ class Player:
 
     def receive(self, amount):
         self.money += amount
+        self.mark_changed()
 
     def buy_property(self, property_obj):
         if self.pay(property_obj.price):
-            self.properties.append(property_obj)
-            property_obj.owner = self
+            self.add_property(property_obj)
             return True
         return False
 
+    def add_property(self, property_obj):
+        self.properties.append(property_obj)
+        property_obj.owner = self
+        self.color_counts[property_obj.color] = self.color_counts.get(property_obj.color, 0) + 1
+        self.mark_changed()
+
+    def release_properties(self):
+        """Gives up every owned property, e.g. on bankruptcy."""
+        for prop in self.properties:
+            prop.owner = None
+        self.properties = []
+        self.color_counts = {}
+        self.mark_changed()
+
     def get_state(self):
         """Returns the player's state as a dictionary."""
         return {
@@ -49,6 +84,10 @@ class Player:
             "isBankrupt": self.is_bankrupt,
         }
 
+    def owns_color_set(self, color, set_size):
+        """Checks if the player owns all `set_size` properties of `color`."""
+        return set_size > 0 and self.color_counts.get(color, 0) == set_size
+
     def owns_all_properties_in_set(self, property_set):
-        """Checks if the player owns all properties in a given set (list of properties)."""
-        return all(prop in self.properties for prop in property_set)
+        """Checks if the player owns all properties in a given color set (a list from Board.color_map)."""
+        return bool(property_set) and self.owns_color_set(property_set[0].color, len(property_set))
@@ -0,0 +1,93 @@
+# monopoly/profiler.py
+"""
+Opt-in sampling profiler for a running server.
+
+A background thread looks at every other thread's stack every `interval`
+seconds and counts what it sees, so the cost is set by the sampling rate,
+not by how much code runs. Nothing runs until `start` is called.
+"""
+import collections
+import os
+import sys
+import threading
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.005, max_depth=40):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self._stacks = collections.Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def clear(self):
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stacks.append(";".join(reversed(stack)))
+            with self._lock:
+                self._stacks.update(stacks)
+                self.samples += 1
+
+    def report(self, limit=25):
+        """
+        The functions seen most often, by samples where they were running
+        (self) and where they were anywhere on the stack (total), plus the
+        most common stacks in folded form for flame graph tools.
+        """
+        with self._lock:
+            stacks = dict(self._stacks)
+            samples = self.samples
+        own = collections.Counter()
+        total = collections.Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for label in set(frames):
+                total[label] += count
+        return {
+            "running": self.running,
+            "samples": samples,
+            "intervalSeconds": self.interval,
+            "top": [{"function": label, "self": count, "total": total[label]} for label, count in own.most_common(limit)],
+            "folded": [f"{stack} {count}" for stack, count in collections.Counter(stacks).most_common(limit * 4)],
+        }
+
+
+PROFILER = SamplingProfiler()
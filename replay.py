@@ -0,0 +1,289 @@
+# monopoly/replay.py
+"""
+Deterministic replay of recorded games, with a state diff per command.
+
+A recording is a JSON file with the seed (or a saved snapshot) the game
+started from and the commands sent to it:
+
+    {"seed": 42, "options": {"board_size": 12}, "config": {"STARTING_MONEY": 500},
+     "commands": [{"command": "join", "player": "Ake"}, {"player": "Ake", "message": "!roll"}, ...]}
+
+Entries with "message" are raw chat and go through parse_command first. A
+room saved with PERSISTENCE_DIR can be used directly: its snapshot is the
+starting point and its journal the commands.
+
+    python replay.py run game.json --diffs           # what every command changed
+    python replay.py compare game.json --engine ../monopoly-main
+    python replay.py generate --seed 7 --output game.json
+
+`compare` replays the recording on this checkout and on another one (run in
+a subprocess with that checkout's game code) and reports the first command
+after which the two engines disagree. Use it to check that a refactor of
+game.py or board.py behaves identically.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+# Same names as in persistence.py, which is not imported so that `dump` can load another checkout's game.py
+SNAPSHOT_FILE = "snapshot.json"
+JOURNAL_FILE = "journal.jsonl"
+
+
+def load_recording(path):
+    """Reads a recording file, or builds one from a persisted room directory."""
+    if not os.path.isdir(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    with open(os.path.join(path, SNAPSHOT_FILE), encoding="utf-8") as f:
+        snapshot = json.load(f)
+    commands = []
+    journal_path = os.path.join(path, JOURNAL_FILE)
+    if os.path.exists(journal_path):
+        with open(journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break # Torn last line from a crash
+                if record["seq"] > snapshot["journalSeq"]:
+                    commands.append({"command": record["command"], "player": record["player"], "args": record["args"],
+                                     "outcome": record.get("outcome")})
+    return {"snapshot": snapshot["game"], "commands": commands}
+
+
+def _log_lines(game, cursor):
+    """Log lines added since `cursor`, for engines with a GameLog or a plain list."""
+    log = game.log
+    if hasattr(log, "next_seq"):
+        return log.messages(max(cursor, log.first_seq)), log.next_seq
+    return list(log[cursor:]), len(log)
+
+
+def canonical_state(game, positions):
+    """
+    Everything a command can change, in a form two engine versions can agree on.
+    Only long-standing Game and Player attributes are used.
+    """
+    return {
+        "gameState": game.game_state,
+        "turnIndex": game.current_turn_index,
+        "pendingAction": game.pending_action,
+        "players": [
+            [p.name, p.money, p.position, p.is_bankrupt, [positions[id(prop)] for prop in p.properties]]
+            for p in game.players
+        ],
+    }
+
+
+def replay(recording, config_overrides=None):
+    """
+    Replays a recording and yields (step, entry, state, new_log_lines), starting
+    with step 0 for the state before the first command.
+    """
+    from command_parser import parse_command
+    from config import SETTINGS
+    from game import Game
+
+    config = dict(SETTINGS, **recording.get("config", {}), **(config_overrides or {}))
+    if "snapshot" in recording:
+        game = Game.from_snapshot(config, recording["snapshot"])
+    else:
+        options = dict(recording.get("options", {}))
+        if recording.get("seed") is not None:
+            options["seed"] = recording["seed"]
+        game = Game(config, options)
+
+    positions = {id(space): i for i, space in enumerate(game.board.spaces)}
+    lines, cursor = _log_lines(game, 0)
+    state = canonical_state(game, positions)
+    # The layout only needs checking once; commands never change it.
+    state["board"] = [[space.space_type, space.name, getattr(space, "price", None), getattr(space, "rent", None)]
+                      for space in game.board.spaces]
+    yield 0, None, state, lines
+
+    for step, entry in enumerate(recording["commands"], 1):
+        if "message" in entry:
+            command_data = parse_command(entry["message"], entry["player"], game.game_state)
+            if command_data is not None:
+                game.run_command(command_data["command"], entry["player"], command_data.get("args"))
+        else:
+            game.run_command(entry["command"], entry["player"], entry.get("args"))
+        lines, cursor = _log_lines(game, cursor)
+        yield step, entry, canonical_state(game, positions), lines
+
+
+def diff(old, new, path=""):
+    """Returns [path, old, new] for every value that differs between two JSON-like values."""
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = []
+        for key in list(old) + [k for k in new if k not in old]:
+            changes.extend(diff(old.get(key), new.get(key), f"{path}.{key}" if path else str(key)))
+        return changes
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        changes = []
+        for i, (a, b) in enumerate(zip(old, new)):
+            changes.extend(diff(a, b, f"{path}[{i}]"))
+        return changes
+    return [] if old == new else [[path, old, new]]
+
+
+def _outcome(state):
+    """The journal's outcome record (see persistence.command_outcome) for a canonical state."""
+    return [state["gameState"], state["turnIndex"], [[p[0], p[2], p[1]] for p in state["players"]]]
+
+
+def step_diffs(recording, config_overrides=None):
+    """
+    Yields {"step", "entry", "changes", "log"} for every command of the
+    recording, plus "outcomeMismatch" when a journaled outcome was not reproduced.
+    """
+    previous = None
+    for step, entry, state, lines in replay(recording, config_overrides):
+        if previous is not None:
+            record = {"step": step, "entry": entry, "changes": diff(previous, state), "log": lines}
+            if entry.get("outcome") is not None and entry["outcome"] != _outcome(state):
+                record["outcomeMismatch"] = True
+            yield record
+        previous = state
+
+
+def _engine_steps(recording_path, engine_dir, config_overrides):
+    """Runs the recording on another checkout and yields its (state, log lines) per step."""
+    command = [sys.executable, os.path.abspath(__file__), "dump", os.path.abspath(recording_path),
+               "--engine", os.path.abspath(engine_dir)]
+    for key, value in (config_overrides or {}).items():
+        command += ["--set", f"{key}={value}"]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True, cwd=engine_dir)
+    try:
+        for line in process.stdout:
+            record = json.loads(line)
+            yield record["state"], record["log"]
+    finally:
+        if process.poll() is None:
+            process.kill() # compare stopped at a divergence and needs no more steps
+        process.stdout.close()
+        process.wait()
+
+
+def compare(recording_path, engine_dir, config_overrides=None):
+    """
+    Replays the recording here and on `engine_dir` in lockstep. Returns None if
+    both agree on every step, else a dict describing the first divergence.
+    """
+    recording = load_recording(recording_path)
+    other = _engine_steps(recording_path, engine_dir, config_overrides)
+    for step, entry, state, lines in replay(recording, config_overrides):
+        theirs = next(other, None)
+        if theirs is None:
+            return {"step": step, "entry": entry, "reason": "the other engine stopped early"}
+        their_state, their_lines = theirs
+        changes = diff(their_state, state)
+        if changes or their_lines != lines:
+            return {"step": step, "entry": entry, "changes": changes,
+                    "log": {"other": their_lines, "this": lines} if their_lines != lines else None}
+    if next(other, None) is not None:
+        return {"step": len(recording["commands"]) + 1, "reason": "the other engine produced more steps"}
+    return None
+
+
+def generate(seed, players=4, board_size=12, max_steps=2000, config=None):
+    """
+    A random but reproducible recording: bots join, then take their turns,
+    mixed with out-of-turn commands and chat noise.
+    """
+    rng = random.Random(seed)
+    names = [f"bot{i}" for i in range(players)]
+    recording = {"seed": seed, "options": {"board_size": board_size}, "config": config or {}, "commands": []}
+    commands = recording["commands"]
+    commands.extend({"command": "join", "player": name} for name in names)
+    commands.append({"command": "start", "player": names[0]})
+
+    # The bots need to see the game to play it, so the recording is built by
+    # playing: each command is appended just before the replay reaches it.
+    setup = len(commands)
+    for step, entry, state, _ in replay(recording):
+        if step < len(commands):
+            continue
+        if state["gameState"] != "IN_PROGRESS" or len(commands) >= setup + max_steps:
+            break
+        roll = rng.random()
+        if roll < 0.05:
+            commands.append({"player": rng.choice(names), "message": rng.choice(["lol", "!status", "!board", "!buy"])})
+        elif state["pendingAction"]:
+            commands.append({"command": rng.choice(["buy", "pass"]), "player": state["pendingAction"]["player"]})
+        else:
+            player_name = state["players"][state["turnIndex"]][0]
+            if roll < 0.08:
+                player_name = rng.choice(names) # Out of turn, as chat often is
+            commands.append({"command": "roll", "player": player_name})
+    return recording
+
+
+def _parse_setting(text):
+    key, _, value = text.partition("=")
+    return key, json.loads(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded Mini Monopoly games.")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+    run_parser = subparsers.add_parser("run", help="replay a recording and report what each command changed")
+    run_parser.add_argument("recording")
+    run_parser.add_argument("--diffs", action="store_true", help="print the changes of every command")
+    compare_parser = subparsers.add_parser("compare", help="find where another checkout's engine diverges")
+    compare_parser.add_argument("recording")
+    compare_parser.add_argument("--engine", required=True, help="directory of the other checkout")
+    dump_parser = subparsers.add_parser("dump", help="print the state after every command (used by compare)")
+    dump_parser.add_argument("recording")
+    dump_parser.add_argument("--engine", help="import the game code from this directory")
+    generate_parser = subparsers.add_parser("generate", help="write a random recording")
+    generate_parser.add_argument("--seed", type=int, default=0)
+    generate_parser.add_argument("--players", type=int, default=4)
+    generate_parser.add_argument("--size", type=int, default=12)
+    generate_parser.add_argument("--steps", type=int, default=2000)
+    generate_parser.add_argument("--output", required=True)
+    for subparser in (run_parser, compare_parser, dump_parser, generate_parser):
+        subparser.add_argument("--set", type=_parse_setting, action="append", default=[], metavar="KEY=VALUE",
+                               help="override a config.py setting")
+    args = parser.parse_args()
+    overrides = dict(args.set)
+
+    if args.mode == "dump":
+        if args.engine:
+            sys.path[0] = args.engine # Import game code from the other checkout instead of this one
+        for step, entry, state, lines in replay(load_recording(args.recording), overrides):
+            print(json.dumps({"step": step, "state": state, "log": lines}, separators=(',', ':')))
+    elif args.mode == "run":
+        recording = load_recording(args.recording)
+        started = time.perf_counter()
+        steps = 0
+        for record in step_diffs(recording, overrides):
+            steps += 1
+            if args.diffs:
+                print(json.dumps(record))
+            elif record.get("outcomeMismatch"):
+                print(f"Step {record['step']} did not reproduce the journaled outcome.", file=sys.stderr)
+        elapsed = time.perf_counter() - started
+        print(json.dumps({"commands": steps, "seconds": round(elapsed, 3),
+                          "commandsPerSecond": round(steps / elapsed) if elapsed else None}), file=sys.stderr)
+    elif args.mode == "compare":
+        divergence = compare(args.recording, args.engine, overrides)
+        if divergence is None:
+            print("Both engines agree on every command.")
+        else:
+            print(json.dumps(divergence, indent=2))
+            sys.exit(1)
+    else:
+        recording = generate(args.seed, args.players, args.size, args.steps, overrides)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(recording, f)
+        print(f"Wrote {len(recording['commands'])} commands to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,499 @@
+# monopoly/rooms.py
+import collections
+import os
+import re
+import threading
+import time
+
+from events import EventBus
+from game import Game
+from ingest import ChatIngestor
+from persistence import GameStore
+from metrics import METRICS
+from scheduler import TurnScheduler
+from serialization import state_json
+from state_store import VersionConflict, open_state_store
+from stats import StatsStore
+from voting import CrowdVote
+
+DEFAULT_ROOM = "default"
+ROOM_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+# Times a command is rerun on a newer state when other workers keep saving first
+MAX_SAVE_ATTEMPTS = 10
+
+# Returned by Room.cached_value and Room.cached_state_body when they would have to build
+NOT_CACHED = object()
+
+_CONFLICTS = METRICS.series("monopoly_state_conflicts_total")
+
+
+class Room:
+    """A single game plus everything that has to stay with it across new games."""
+    def __init__(self, room_id, config, game_options=None, scheduler=None, stats=None, shared=None):
+        self.room_id = room_id
+        self.config = config
+        # State store shared with other worker processes, if any (see state_store.py)
+        self.shared = shared
+        self.state_version = 0 # Version of the shared state the game was loaded at or saved as
+        self._saved_log_seq = 0 # End of the game log at that version
+        # Shared timer for turn timeouts and vote windows; None disables both
+        self.scheduler = scheduler
+        # Shared stats store that finished games are recorded in, if any
+        self.stats = stats
+        self._turn_key = None
+        self._sync_armed = False
+        # Commands are serialized per room; different rooms run concurrently.
+        self.lock = threading.RLock()
+        # The bus outlives individual games so subscribers survive a new game.
+        self.event_bus = EventBus()
+        self.store = None
+        persistence_dir = config.get("PERSISTENCE_DIR")
+        if persistence_dir:
+            self.store = GameStore(
+                os.path.join(persistence_dir, room_id),
+                snapshot_interval=config.get("SNAPSHOT_INTERVAL", 200),
+                fsync_interval=config.get("JOURNAL_FSYNC_INTERVAL_SECONDS", 0.2),
+            )
+        self.game = None
+        if self.shared:
+            loaded = self.shared.load(room_id)
+            if loaded is not None:
+                self.state_version, snapshot = loaded
+                self.game = Game.from_snapshot(config, snapshot, event_bus=self.event_bus,
+                                               game_options=self._log_options())
+            if self.game is not None and self.store:
+                self.store.save_snapshot(self.game) # Start the local journal from the shared state
+        if self.game is None and self.store:
+            self.game = self.store.load(config, event_bus=self.event_bus, game_options=self._log_options())
+        if self.game is None:
+            self.game = self._create_game(game_options)
+            if self.store:
+                self.store.save_snapshot(self.game)
+        if self.shared and self.state_version == 0:
+            try:
+                self.state_version = self.shared.save(room_id, self.game.to_snapshot(), 0)
+            except VersionConflict:
+                self._reload() # Another worker created the room first
+            self._saved_log_seq = self.game.log.next_seq
+        self._schedule_turn_timeout()
+        self.voting = None
+        if config.get("CROWD_VOTING"):
+            self.voting = CrowdVote(self, window_seconds=config.get("VOTE_WINDOW_SECONDS", 10),
+                                    min_votes=config.get("VOTE_MIN_VOTES", 1))
+        self.ingestor = ChatIngestor(self, rate_limit_seconds=config.get("COMMAND_RATE_LIMIT_SECONDS", 2))
+        self.last_used = time.monotonic()
+        # Open event streams. A room with any is in use even when no requests come in.
+        self.subscribers = 0
+        self._subscribers_lock = threading.Lock()
+        # Set once the registry has let go of the room; its streams end
+        self.closed = False
+        # Data derived from the game, stored as (game version, value)
+        self.cache = {}
+        # (game version, {since: encoded get_state() result}), swapped as a
+        # whole so it can be read without the lock
+        self._state_bodies = (None, {})
+
+    def subscribe(self):
+        """Counts an open event stream; call unsubscribe() when it ends."""
+        with self._subscribers_lock:
+            self.subscribers += 1
+            self.last_used = time.monotonic()
+
+    def unsubscribe(self):
+        with self._subscribers_lock:
+            self.subscribers -= 1
+            self.last_used = time.monotonic()
+
+    def cached(self, key, build):
+        """Returns build(game), reusing the last result until the game changes."""
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry is None or entry[0] != self.game.version:
+                entry = (self.game.version, build(self.game))
+                self.cache[key] = entry
+            return entry[1]
+
+    def cached_value(self, key):
+        """
+        What cached(key, ...) would return, read without taking the lock, or
+        NOT_CACHED if it has to be built first.
+        """
+        entry = self.cache.get(key)
+        if entry is None or entry[0] != self.game.version:
+            return NOT_CACHED
+        return entry[1]
+
+    def state_body(self, since=None):
+        """
+        get_state(since) encoded as JSON, or None if nothing changed since then.
+        Each full or delta state is encoded once per game version.
+        """
+        with self.lock:
+            game = self.game
+            version, bodies = self._state_bodies
+            if version != game.version:
+                bodies = {}
+                self._state_bodies = (game.version, bodies)
+            if since is not None and not game.has_version(since):
+                since = None # From another game or process; all get the same full state
+            if since in bodies:
+                return bodies[since]
+            state = game.get_state(since=since)
+            body = None if state is None else state_json(state)
+            if len(bodies) < 64: # Clients are rarely more than a few versions apart
+                bodies[since] = body
+            return body
+
+    def cached_state_body(self, since=None):
+        """
+        What state_body(since) would return, read without taking the lock,
+        or NOT_CACHED if it has to be built first.
+        """
+        version, bodies = self._state_bodies
+        game = self.game
+        if version != game.version:
+            return NOT_CACHED
+        if since is not None and not game.has_version(since):
+            since = None
+        return bodies.get(since, NOT_CACHED)
+
+    def run_command(self, command, player_name, args=None, move=None, announce=None, notice=None):
+        """
+        Runs a parsed command against the room's game and journals it. With
+        `move` set to a turn key, the command only runs while that move is
+        still the one the game waits for. Returns False if it did not run.
+        `announce` is a log line (message, *args) written just before the
+        command, and `notice` an (event type, data) published once it ran.
+
+        With a shared state store the command is saved before anything is
+        published. If another worker saved first, the newer state is loaded
+        and the command runs again on it.
+        """
+        with self.lock:
+            self.last_used = time.monotonic() # Timeouts and votes keep a room in use too
+            for _ in range(MAX_SAVE_ATTEMPTS):
+                if move is not None and not self._awaits(move):
+                    return False
+                game = self.game
+                was_finished = game.game_state == "FINISHED"
+                game.hold_events = self.shared is not None
+                if announce:
+                    game._add_log(*announce)
+                game.run_command(command, player_name, args)
+                if not self.shared:
+                    break
+                try:
+                    self.state_version = self.shared.save(self.room_id, game.to_snapshot(), self.state_version)
+                    self._saved_log_seq = game.log.next_seq
+                    break
+                except VersionConflict:
+                    _CONFLICTS.inc()
+                    self._reload()
+            else:
+                print(f"--- Dropped !{command} from {player_name} in room {self.room_id}: "
+                      f"{MAX_SAVE_ATTEMPTS} conflicting saves in a row ---")
+                return False
+            if notice:
+                self.event_bus.publish(*notice)
+            if game.hold_events:
+                game.hold_events = False
+                game._publish_changes()
+            if self.store:
+                self.store.record_command(self.game, command, player_name, args)
+                self._schedule_journal_sync()
+            if self.stats and not was_finished and self.game.game_state == "FINISHED":
+                self.stats.record_game(self.room_id, self.game)
+            self._schedule_turn_timeout()
+            return True
+
+    def _schedule_journal_sync(self):
+        # The journal fsyncs on the next append once its interval has passed;
+        # this covers the last commands of a burst, when no next append comes.
+        if self.scheduler is None or self._sync_armed or not self.store.journal.pending:
+            return
+        self._sync_armed = True
+        self.scheduler.arm(("sync", self.room_id), True, self.store.journal.fsync_interval)
+
+    def sync_journal(self):
+        with self.lock:
+            self._sync_armed = False
+            if self.store:
+                self.store.journal.sync()
+
+    def _awaits(self, move):
+        # Turn keys start with the game's local base version, which changes on
+        # every reload, so only the turn, player and action are compared.
+        turn_key = self.game.turn_key()
+        return turn_key is not None and turn_key[1:] == move[1:]
+
+    def _reload(self):
+        """
+        Brings the game up to the latest shared state, undoing anything that
+        was not saved. The same game is updated in place when possible, so
+        readers get a delta; after a new game elsewhere it is replaced.
+        """
+        loaded = self.shared.load(self.room_id)
+        if loaded is None:
+            return
+        version, snapshot = loaded
+        game = self.game
+        game.hold_events = False
+        game.log.truncate(self._saved_log_seq) # Lines of a command that lost its save, or never saved
+        if not game.apply_snapshot(snapshot):
+            game = Game.from_snapshot(self.config, snapshot, event_bus=self.event_bus, game_options=self._log_options())
+            self.game.log.close()
+            self.game = game
+            self.event_bus.publish("state", game.get_state())
+        self.state_version = version
+        self._saved_log_seq = game.log.next_seq
+        if self.store:
+            self.store.save_snapshot(game)
+        self._schedule_turn_timeout()
+
+    def refresh(self, version):
+        """Called when another worker saved `version` of this room; loads it unless it is already here."""
+        with self.lock:
+            if version > self.state_version:
+                self._reload()
+
+    def expire_turn(self, turn_key):
+        """
+        Makes the stalled move for the player who ran out of time: passes on a
+        pending purchase, otherwise rolls. Does nothing if the move was made meanwhile.
+        """
+        with self.lock:
+            game = self.game
+            if game.turn_key() != turn_key:
+                return False
+            player_name = turn_key[2]
+            command = "pass" if game.pending_action else "roll"
+            # Another worker may have made the move already; then this one is dropped.
+            return self.run_command(
+                command, player_name, move=turn_key,
+                announce=("{} ran out of time. Sending !{} automatically.", player_name, command),
+                notice=("turn_expired", {"player": player_name, "command": command}),
+            )
+
+    def schedule_vote(self, turn_key, delay):
+        if self.scheduler is not None:
+            self.scheduler.arm(("vote", self.room_id), turn_key, delay)
+
+    def resolve_vote(self, turn_key):
+        """Runs the crowd's choice for `turn_key`, unless the player moved before the window closed."""
+        with self.lock:
+            result = self.voting.close(turn_key) if self.voting else None
+            if result is None or self.game.turn_key() != turn_key:
+                return False
+            command, counts = result
+            player_name = turn_key[2]
+            tally = ", ".join(f"!{option}: {count}" for option, count in counts.items())
+            return self.run_command(
+                command, player_name, move=turn_key,
+                announce=("Chat voted !{} for {} ({}).", command, player_name, tally),
+                notice=("vote_result", {"player": player_name, "command": command, "counts": counts}),
+            )
+
+    def _schedule_turn_timeout(self):
+        if self.scheduler is None:
+            return
+        turn_key = self.game.turn_key()
+        if turn_key == self._turn_key:
+            return # Still waiting for the same move; keep its deadline
+        self._turn_key = turn_key
+        timeout = self.config.get("TURN_TIMEOUT_SECONDS")
+        if turn_key is None or not timeout:
+            self.scheduler.cancel(("turn", self.room_id))
+        else:
+            self.scheduler.arm(("turn", self.room_id), turn_key, timeout)
+    def _log_options(self):
+        spill_dir = self.config.get("LOG_SPILL_DIR")
+        if not spill_dir:
+            return {}
+        os.makedirs(spill_dir, exist_ok=True)
+        return {"log_spill_path": os.path.join(spill_dir, f"{self.room_id}-{int(time.time())}.log")}
+
+    def _create_game(self, game_options=None):
+        game_options = dict(game_options or {}, **self._log_options())
+        return Game(config=self.config, game_options=game_options, event_bus=self.event_bus)
+
+    def new_game(self, game_options=None):
+        with self.lock:
+            game = self._create_game(game_options) # May raise ValueError on bad options
+            if self.shared:
+                snapshot = game.to_snapshot()
+                while True:
+                    try:
+                        self.state_version = self.shared.save(self.room_id, snapshot, self.state_version)
+                        break
+                    except VersionConflict as e:
+                        self.state_version = e.current # A new game replaces whatever was saved meanwhile
+                self._saved_log_seq = game.log.next_seq
+            self.game.log.close()
+            self.game = game
+            if self.store:
+                self.store.save_snapshot(self.game)
+            self._schedule_turn_timeout()
+            self.event_bus.publish("state", self.game.get_state())
+            return self.game
+
+    def close(self):
+        """
+        Releases the room's files, snapshotting the game first if it is
+        persisted. Open event streams get a `resync` and end, so their clients
+        reconnect to the room that replaces this one.
+        """
+        with self.lock:
+            self.closed = True
+            self.event_bus.publish("resync", {})
+            if self.scheduler is not None:
+                self.scheduler.cancel(("turn", self.room_id))
+                self.scheduler.cancel(("vote", self.room_id))
+                self.scheduler.cancel(("sync", self.room_id))
+            if self.store:
+                self.store.close(self.game)
+            self.game.log.close()
+
+
+class RoomRegistry:
+    """
+    Keeps one Room per room id, creating rooms on first use.
+
+    Rooms are kept in least-recently-used order. Rooms idle for longer than
+    `idle_timeout` seconds are evicted, and so is the least recently used room
+    whenever more than `max_rooms` exist.
+    """
+    def __init__(self, config, max_rooms=100, idle_timeout=3600):
+        self.config = config
+        self.max_rooms = max_rooms
+        self.idle_timeout = idle_timeout
+        self._rooms = collections.OrderedDict()
+        self._lock = threading.Lock()
+        # One timer thread serves the turn timeouts, vote windows and journal fsyncs of every room.
+        self.scheduler = TurnScheduler(on_expire=self._on_timer)
+        stats_path = config.get("STATS_DB_PATH")
+        self.stats = StatsStore(stats_path) if stats_path else None
+        self.shared = open_state_store(config.get("STATE_STORE"),
+                                       poll_interval=config.get("STATE_POLL_INTERVAL_SECONDS", 0.05))
+        if self.shared:
+            self.shared.subscribe(self._on_state_change)
+        self._close_listeners = []
+
+    def __len__(self):
+        return len(self._rooms)
+
+    def __contains__(self, room_id):
+        return room_id in self._rooms
+
+    def add_close_listener(self, callback):
+        """Calls `callback(room)` after a room is removed or evicted, to drop anything kept for it."""
+        self._close_listeners.append(callback)
+
+    def _closed(self, room):
+        room.close()
+        for callback in self._close_listeners:
+            callback(room)
+
+    def get(self, room_id, create=True):
+        """Returns the room for `room_id`, or None if it does not exist and `create` is False."""
+        if not ROOM_ID_PATTERN.match(room_id):
+            raise ValueError(f"Invalid room id: {room_id!r}")
+        now = time.monotonic()
+        with self._lock:
+            room = self._rooms.get(room_id)
+            if room is None:
+                if not create:
+                    return None
+                room = Room(room_id, self.config, scheduler=self.scheduler, stats=self.stats, shared=self.shared)
+                self._rooms[room_id] = room
+            else:
+                self._rooms.move_to_end(room_id)
+            room.last_used = now
+            self._evict(now)
+            return room
+
+    def remove(self, room_id):
+        with self._lock:
+            room = self._rooms.pop(room_id, None)
+        if room is not None:
+            self._closed(room)
+        return room
+
+    def restore_persisted(self):
+        """Loads every room that has saved state, most recently saved last."""
+        persistence_dir = self.config.get("PERSISTENCE_DIR")
+        if not persistence_dir or not os.path.isdir(persistence_dir):
+            return []
+        room_ids = [name for name in os.listdir(persistence_dir) if ROOM_ID_PATTERN.match(name)]
+        room_ids.sort(key=lambda name: os.path.getmtime(os.path.join(persistence_dir, name)))
+        return [self.get(room_id) for room_id in room_ids[-self.max_rooms:]]
+
+    def close_all(self):
+        self.scheduler.stop()
+        with self._lock:
+            rooms = list(self._rooms.values())
+            self._rooms.clear()
+        for room in rooms:
+            room.close()
+        if self.stats:
+            self.stats.close()
+        if self.shared:
+            self.shared.close()
+
+    def evict_idle(self):
+        with self._lock:
+            self._evict(time.monotonic())
+
+    def metric_families(self):
+        """Per-room series for /metrics, read when it is scraped."""
+        with self._lock:
+            rooms = list(self._rooms.values())
+        log_entries, players, queue_depth, chat = [], [], [], []
+        for room in rooms:
+            labels = {"room": room.room_id}
+            game = room.game
+            log_entries.append((labels, game.log.next_seq - game.log.first_seq))
+            players.append((labels, len(game.players)))
+            queue_depth.append((labels, room.ingestor.stats()["queue_depth"]))
+            chat.extend((dict(labels, outcome=outcome), count) for outcome, count in sorted(room.ingestor.counters.items()))
+        return [
+            ("monopoly_rooms", "gauge", "Rooms currently loaded.", [({}, len(rooms))]),
+            ("monopoly_log_entries", "gauge", "Log entries held in memory, by room.", log_entries),
+            ("monopoly_players", "gauge", "Players in the room's game.", players),
+            ("monopoly_chat_queue_depth", "gauge", "Chat commands waiting to be applied.", queue_depth),
+            ("monopoly_chat_messages_total", "counter", "Chat messages seen by the ingestor, by outcome.", chat),
+        ]
+
+    def _on_state_change(self, room_id, version):
+        # Rooms this worker has not loaded will read the latest state when they are.
+        with self._lock:
+            room = self._rooms.get(room_id)
+        if room is not None:
+            room.refresh(version)
+
+    def _on_timer(self, key, turn_key):
+        kind, room_id = key
+        with self._lock:
+            room = self._rooms.get(room_id)
+        if room is None:
+            return
+        if kind == "vote":
+            room.resolve_vote(turn_key)
+        elif kind == "sync":
+            room.sync_journal()
+        else:
+            room.expire_turn(turn_key)
+
+    def _evict(self, now):
+        # The oldest rooms are at the front, so stop at the first one still in use.
+        # A room with open event streams is in use and moves to the back instead.
+        for _ in range(len(self._rooms)):
+            room_id, room = next(iter(self._rooms.items()))
+            if room.subscribers:
+                room.last_used = now
+                self._rooms.move_to_end(room_id)
+                continue
+            expired = now - room.last_used > self.idle_timeout
+            if not expired and len(self._rooms) <= self.max_rooms:
+                break
+            del self._rooms[room_id]
+            self._closed(room)
@@ -0,0 +1,85 @@
+# monopoly/scheduler.py
+import heapq
+import itertools
+import threading
+import time
+
+
+class TurnScheduler:
+    """
+    Deadlines for every game's pending move, kept in one heap and served by a
+    single background thread no matter how many games are running.
+
+    Each key (a kind and a room id) has at most one live deadline, identified by a token.
+    Re-arming or cancelling a key does not search the heap: the old entry is
+    simply left behind and skipped when it comes up, so every operation is
+    O(log n).
+    """
+    def __init__(self, on_expire):
+        self.on_expire = on_expire
+        self._heap = []
+        self._tokens = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def arm(self, key, token, delay):
+        """Calls on_expire(key, token) after `delay` seconds unless re-armed or cancelled first."""
+        deadline = time.monotonic() + delay
+        with self._condition:
+            self._tokens[key] = token
+            heapq.heappush(self._heap, (deadline, next(self._counter), key, token))
+            if len(self._heap) > 2 * len(self._tokens) + 64:
+                self._compact()
+            if self._heap[0][2] == key:
+                self._condition.notify()
+
+    def cancel(self, key):
+        with self._condition:
+            self._tokens.pop(key, None)
+
+    def run_pending(self, now=None):
+        """Fires every deadline that has passed. Returns how many fired."""
+        now = time.monotonic() if now is None else now
+        expired = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, key, token = heapq.heappop(self._heap)
+                if self._tokens.get(key) == token:
+                    del self._tokens[key]
+                    expired.append((key, token))
+        for key, token in expired:
+            self.on_expire(key, token)
+        return len(expired)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="turn-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if self._stopped:
+                    return
+                timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                if timeout is None or timeout > 0:
+                    self._condition.wait(timeout)
+            try:
+                self.run_pending()
+            except Exception as e:
+                print(f"--- Turn scheduler error: {e!r} ---")
+
+    def _compact(self):
+        # Drop entries that were re-armed or cancelled since they were pushed.
+        self._heap = [entry for entry in self._heap if self._tokens.get(entry[2]) == entry[3]]
+        heapq.heapify(self._heap)
@@ -0,0 +1,83 @@
+# monopoly/serialization.py
+"""
+JSON encoding for game payloads.
+
+The board's static description (names, types, colors, prices, rents and
+images) never changes during a game, so it is serialized once per Board and
+served with an ETag. Everything that does change is sent as a compact
+payload of plain lists.
+"""
+import hashlib
+import json
+
+from metrics import METRICS
+
+try:
+    import orjson
+except ImportError: # orjson is optional; the standard library encoder is the fallback
+    orjson = None
+
+
+def dumps(data):
+    """Serializes `data` to compact JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, separators=(',', ':')).encode()
+
+
+def state_json(state):
+    """Serializes a full or delta state from Game.get_state, recording its size."""
+    body = dumps(state)
+    METRICS.observe("monopoly_state_payload_bytes", len(body), kind="delta" if "since" in state else "full")
+    return body
+
+
+def board_payload(board):
+    """Returns (json_bytes, etag) for the board's static description, built once per Board."""
+    if board.static_cache is None:
+        spaces = []
+        for space in board.spaces:
+            entry = {"name": space.name, "type": space.space_type}
+            if space.space_type == "PROPERTY":
+                entry.update({"color": space.color, "price": space.price, "rent": space.rent})
+            spaces.append(entry)
+        # Image URLs are per space type, so they are sent once per type.
+        images = {space_type: url for space_type, url in board.image_urls.items() if url}
+        description = {"size": board.size, "jailPos": board.jail_pos, "spaces": spaces, "images": images}
+        key = hashlib.sha1(dumps(description)).hexdigest()[:16]
+        description["key"] = key
+        board.static_cache = (dumps(description), key)
+    return board.static_cache
+
+
+def compact_state(game):
+    """
+    The changing part of a game as plain lists:
+    owners are [position, player name] pairs and players are
+    [name, money, position, is_bankrupt, [owned positions]].
+    """
+    spaces = game.board.spaces
+    position_of = {id(space): i for i, space in enumerate(spaces)}
+    owners = [[i, space.owner.name] for i, space in enumerate(spaces)
+              if space.space_type == "PROPERTY" and space.owner is not None]
+    players = [[p.name, p.money, p.position, p.is_bankrupt, [position_of[id(prop)] for prop in p.properties]]
+               for p in game.players]
+    current_player = game.get_current_player()
+    tail_start = game.log.tail_start(game.log_tail)
+    return {
+        "version": game.version,
+        "boardKey": board_payload(game.board)[1],
+        "gameState": game.game_state,
+        "currentPlayerName": current_player.name if game.game_state == "IN_PROGRESS" and current_player else None,
+        "pendingAction": game.pending_action,
+        "owners": owners,
+        "players": players,
+        "log": game.log.messages(tail_start),
+        "logStart": tail_start,
+    }
+
+
+def compact_state_json(game):
+    body = dumps(compact_state(game))
+    METRICS.observe("monopoly_state_payload_bytes", len(body), kind="compact")
+    return body
@@ -0,0 +1,155 @@
+# monopoly/simulation.py
+"""
+Headless simulation of full games between bots, for balance tuning.
+
+Games run with logging turned off and a fixed seed each, so every game in a
+batch can be reproduced. Example:
+
+    python simulation.py --games 2000 --sizes 12 16 24 --set STARTING_MONEY=1000
+"""
+import argparse
+import collections
+import json
+import os
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+
+from config import SETTINGS
+from game import Game
+
+
+def always_buy(game, player, space):
+    return "buy"
+
+def never_buy(game, player, space):
+    return "pass"
+
+def keep_reserve(game, player, space):
+    """Buys only if the player keeps at least twice the tax amount afterwards."""
+    reserve = 2 * game.config.get('TAX_AMOUNT', 100)
+    return "buy" if player.money - space.price >= reserve else "pass"
+
+POLICIES = {
+    "always_buy": always_buy,
+    "never_buy": never_buy,
+    "keep_reserve": keep_reserve,
+}
+
+
+def play_game(board_size, seed, policy_names, config=SETTINGS, max_turns=1000):
+    """
+    Plays one game between bots, one bot per entry in `policy_names`.
+    Returns a summary dict of the game.
+    """
+    game = Game(config=config, game_options={"board_size": board_size, "seed": seed, "log_enabled": False})
+    policies = {}
+    for i, policy_name in enumerate(policy_names):
+        name = f"bot{i}_{policy_name}"
+        policies[name] = POLICIES[policy_name]
+        game.run_command("join", name)
+    game.run_command("start", next(iter(policies)))
+
+    while game.game_state == "IN_PROGRESS" and game.turns_played < max_turns:
+        if game.pending_action:
+            name = game.pending_action["player"]
+            space = game.board.get_space(game.pending_action["space_pos"])
+            game.run_command(policies[name](game, game.player_map[name], space), name)
+        else:
+            game.run_command("roll", game.get_current_player().name)
+
+    winner = game.players[0].name if game.game_state == "FINISHED" and game.players else None
+    return {
+        "board_size": board_size,
+        "seed": seed,
+        "turns": game.turns_played,
+        "finished": game.game_state == "FINISHED",
+        "players": len(policy_names),
+        "bankruptcies": len(policy_names) - len(game.players),
+        "winner_policy": winner.split("_", 1)[1] if winner else None,
+        # (position, price, rent collected) for every property on the board
+        "properties": [
+            (i, space.price, space.rent_collected)
+            for i, space in enumerate(game.board.spaces)
+            if space.space_type == "PROPERTY"
+        ],
+    }
+
+
+def _play_chunk(args):
+    board_size, seeds, policy_names, config, max_turns = args
+    return [play_game(board_size, seed, policy_names, config, max_turns) for seed in seeds]
+
+
+def summarize(results):
+    """
+    Aggregates play_game summaries of a single board size.
+    Property ROI is rent collected per dollar of list price.
+    """
+    turns = [r["turns"] for r in results]
+    finished = [r for r in results if r["finished"]]
+    wins = collections.Counter(r["winner_policy"] for r in finished)
+    price_by_pos = collections.Counter()
+    rent_by_pos = collections.Counter()
+    for r in results:
+        for pos, price, rent in r["properties"]:
+            price_by_pos[pos] += price
+            rent_by_pos[pos] += rent
+    total_price = sum(price_by_pos.values())
+    return {
+        "games": len(results),
+        "turns_mean": round(statistics.mean(turns), 1),
+        "turns_median": statistics.median(turns),
+        "turns_p90": sorted(turns)[int(len(turns) * 0.9)] if turns else 0,
+        "finished_rate": round(len(finished) / len(results), 3),
+        "bankruptcy_rate": round(sum(r["bankruptcies"] for r in results) / sum(r["players"] for r in results), 3),
+        "win_rate_by_policy": {k: round(v / len(finished), 3) for k, v in wins.items()} if finished else {},
+        "property_roi": round(sum(rent_by_pos.values()) / total_price, 3) if total_price else 0.0,
+        "property_roi_by_position": {
+            pos: round(rent_by_pos[pos] / price_by_pos[pos], 3) for pos in sorted(price_by_pos) if price_by_pos[pos]
+        },
+    }
+
+
+def run_batch(board_sizes, games_per_size, policy_names, config=SETTINGS, base_seed=0,
+              max_turns=1000, workers=None, chunk_size=50):
+    """Plays `games_per_size` games per board size across a process pool and summarizes them."""
+    jobs = []
+    for board_size in board_sizes:
+        seeds = range(base_seed, base_seed + games_per_size)
+        for start in range(0, games_per_size, chunk_size):
+            jobs.append((board_size, list(seeds[start:start + chunk_size]), policy_names, config, max_turns))
+
+    results = collections.defaultdict(list)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in pool.map(_play_chunk, jobs):
+            for result in chunk:
+                results[result["board_size"]].append(result)
+    return {size: summarize(results[size]) for size in board_sizes}
+
+
+def _parse_setting(text):
+    key, _, value = text.partition("=")
+    return key, int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless Mini Monopoly simulations.")
+    parser.add_argument("--games", type=int, default=1000, help="games per board size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[12])
+    parser.add_argument("--policies", nargs="+", default=["always_buy", "keep_reserve", "never_buy"],
+                        choices=sorted(POLICIES))
+    parser.add_argument("--set", type=_parse_setting, action="append", default=[], metavar="KEY=VALUE",
+                        help="override a config.py setting, e.g. STARTING_MONEY=1000")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-turns", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    config = dict(SETTINGS, **dict(args.set))
+    report = run_batch(args.sizes, args.games, args.policies, config=config, base_seed=args.seed,
+                       max_turns=args.max_turns, workers=args.workers)
+    print(json.dumps({"config": config, "policies": args.policies, "results": report}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+# monopoly/state_store.py
+"""
+Game state shared between server processes, so several workers behind a load
+balancer can serve the same rooms.
+
+A store keeps the latest snapshot (Game.to_snapshot()) of every room with a
+version number. Saves are optimistic: a worker passes the version its game
+was loaded at, and the save fails with VersionConflict if another worker
+saved in between. The worker then reloads and runs its command again on the
+newer state.
+
+Every save is announced to the store's subscribers as (room_id, version), so
+a worker only reloads a room when it has actually changed elsewhere and its
+own event stream readers get the new state pushed to them.
+
+    MemoryStateStore()          one process; a stand-in for tests and local runs
+    SQLiteStateStore(path)      every worker on the machine opens the same file
+"""
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS game_states (
+    room TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    snapshot TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS state_changes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    room TEXT NOT NULL,
+    version INTEGER NOT NULL
+);
+"""
+
+# Change records kept for workers that are catching up; older ones are pruned.
+CHANGE_HISTORY = 10000
+
+
+class VersionConflict(Exception):
+    """Raised when a save expected a version that is no longer the current one."""
+    def __init__(self, room_id, expected, current):
+        super().__init__(f"Room {room_id!r} is at version {current}, not {expected}.")
+        self.room_id = room_id
+        self.expected = expected
+        self.current = current
+
+
+def _dumps(snapshot):
+    return json.dumps(snapshot, separators=(',', ':'))
+
+
+def _notify(subscribers, room_id, version):
+    for callback in list(subscribers):
+        try:
+            callback(room_id, version)
+        except Exception as e:
+            print(f"--- State store subscriber error: {e!r} ---")
+
+
+class MemoryStateStore:
+    """
+    Keeps snapshots in a dict. Snapshots are stored serialized, like a shared
+    backend would, so a loaded game never shares objects with the saved one.
+    """
+    def __init__(self):
+        self._states = {} # room_id -> (version, snapshot JSON)
+        self._lock = threading.Lock()
+        self._subscribers = []
+        # Notifications are delivered on their own thread, as they would be
+        # from another process; a subscriber may take its room lock while
+        # another room's lock is held by the thread that saved.
+        self._notifications = queue.Queue()
+        self._dispatcher = None
+
+    def load(self, room_id):
+        """Returns (version, snapshot) for the room, or None if it was never saved."""
+        with self._lock:
+            entry = self._states.get(room_id)
+        if entry is None:
+            return None
+        return entry[0], json.loads(entry[1])
+
+    def version(self, room_id):
+        with self._lock:
+            entry = self._states.get(room_id)
+        return entry[0] if entry else 0
+
+    def save(self, room_id, snapshot, expected_version):
+        """Saves the snapshot if the room is still at `expected_version` (0 if new). Returns the new version."""
+        data = _dumps(snapshot)
+        with self._lock:
+            current = self._states.get(room_id, (0, None))[0]
+            if current != expected_version:
+                raise VersionConflict(room_id, expected_version, current)
+            version = current + 1
+            self._states[room_id] = (version, data)
+        if self._subscribers:
+            self._notifications.put((room_id, version))
+        return version
+
+    def subscribe(self, callback):
+        """Calls `callback(room_id, version)` on a background thread after every save."""
+        self._subscribers.append(callback)
+        if self._dispatcher is None:
+            self._dispatcher = threading.Thread(target=self._dispatch, name="state-store-notify", daemon=True)
+            self._dispatcher.start()
+
+    def _dispatch(self):
+        while True:
+            item = self._notifications.get()
+            if item is None:
+                return
+            _notify(self._subscribers, *item)
+
+    def close(self):
+        if self._dispatcher is not None:
+            self._notifications.put(None)
+            self._dispatcher.join(timeout=1)
+            self._dispatcher = None
+
+
+class SQLiteStateStore:
+    """
+    Keeps snapshots in a SQLite file that every worker process opens. A save
+    is one conditional UPDATE; it also appends to a change table, which each
+    process polls every `poll_interval` seconds to notify its subscribers.
+    """
+    def __init__(self, path, poll_interval=0.05):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._conn = self._connect()
+        self._conn.executescript(SCHEMA)
+        # Shared by request threads, room workers and the turn scheduler.
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._poller = None
+        self._stopped = threading.Event()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def load(self, room_id):
+        """Returns (version, snapshot) for the room, or None if it was never saved."""
+        with self._lock:
+            row = self._conn.execute("SELECT version, snapshot FROM game_states WHERE room = ?", (room_id,)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def version(self, room_id):
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM game_states WHERE room = ?", (room_id,)).fetchone()
+        return row[0] if row else 0
+
+    def save(self, room_id, snapshot, expected_version):
+        """Saves the snapshot if the room is still at `expected_version` (0 if new). Returns the new version."""
+        data = _dumps(snapshot)
+        version = expected_version + 1
+        with self._lock, self._conn:
+            if expected_version == 0:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO game_states (room, version, snapshot, updated_at) VALUES (?, 1, ?, ?)",
+                    (room_id, data, time.time()),
+                )
+            else:
+                cursor = self._conn.execute(
+                    "UPDATE game_states SET version = ?, snapshot = ?, updated_at = ? WHERE room = ? AND version = ?",
+                    (version, data, time.time(), room_id, expected_version),
+                )
+            if cursor.rowcount == 0:
+                row = self._conn.execute("SELECT version FROM game_states WHERE room = ?", (room_id,)).fetchone()
+                raise VersionConflict(room_id, expected_version, row[0] if row else 0)
+            change_id = self._conn.execute(
+                "INSERT INTO state_changes (room, version) VALUES (?, ?)", (room_id, version)
+            ).lastrowid
+            if change_id % 1000 == 0:
+                self._conn.execute("DELETE FROM state_changes WHERE id <= ?", (change_id - CHANGE_HISTORY,))
+        return version
+
+    def subscribe(self, callback):
+        """Calls `callback(room_id, version)` on a background thread for every save, by any process."""
+        self._subscribers.append(callback)
+        if self._poller is None:
+            self._poller = threading.Thread(target=self._poll, name="state-store-poll", daemon=True)
+            self._poller.start()
+
+    def _poll(self):
+        # The poller has its own connection so it never waits on the save lock.
+        conn = self._connect()
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM state_changes").fetchone()[0]
+        try:
+            while not self._stopped.wait(self.poll_interval):
+                rows = conn.execute(
+                    "SELECT id, room, version FROM state_changes WHERE id > ? ORDER BY id", (last_id,)
+                ).fetchall()
+                latest = {}
+                for change_id, room_id, version in rows:
+                    last_id = change_id
+                    latest[room_id] = version # A busy room is reloaded once per poll, not per save
+                for room_id, version in latest.items():
+                    _notify(self._subscribers, room_id, version)
+        finally:
+            conn.close()
+
+    def close(self):
+        self._stopped.set()
+        if self._poller is not None:
+            self._poller.join(timeout=1)
+            self._poller = None
+        with self._lock:
+            self._conn.close()
+
+
+def open_state_store(spec, poll_interval=0.05):
+    """The store for the STATE_STORE setting: None, "memory", or the path of a SQLite file."""
+    if not spec:
+        return None
+    if spec == "memory":
+        return MemoryStateStore()
+    return SQLiteStateStore(spec, poll_interval=poll_interval)
@@ -7,55 +7,180 @@ document.addEventListener('DOMContentLoaded', () => {
     const messageLog = document.getElementById('message-log');
     const gameBoard = document.getElementById('game-board');
 
+    // The room comes from the page URL (?room=<id>); no room means the default game.
+    const room = new URLSearchParams(window.location.search).get('room');
+    const apiBase = room ? `/api/${encodeURIComponent(room)}` : '/api';
+    const setupLink = document.querySelector('.setup-link-container a');
+    if (room && setupLink) setupLink.href = `/setup?room=${encodeURIComponent(room)}`;
+
     // State
-    let lastLog = [];
+    let currentState = null;
+    let renderedLogEnd = 0; // Sequence number after the last rendered log entry
+    const MAX_LOG_LINES = 200;
     let lastBoardSize = 0;
     const playerColors = ['#ff4136', '#0074d9', '#2ecc40', '#ffdc00', '#b10dc9', '#ff851b', '#7fdbff', '#f012be'];
 
+    let pollTimer = null;
+
     // --- Initialization ---
     fetchGameState();
-    setInterval(fetchGameState, 2000);
+    connectEvents();
 
     // --- Event Listeners ---
     commandForm.addEventListener('submit', handleCommandSubmit);
 
     // --- Core Functions ---
+    // Updates are pushed over Server-Sent Events; polling is only the fallback.
+    function connectEvents() {
+        if (!window.EventSource) { startPolling(); return; }
+        const source = new EventSource(currentState ? `${apiBase}/events?since=${currentState.version}` : `${apiBase}/events`);
+        source.addEventListener('state', event => applyUpdate(JSON.parse(event.data)));
+        source.addEventListener('resync', () => { currentState = null; fetchGameState(); });
+        source.onopen = stopPolling;
+        source.onerror = () => {
+            if (source.readyState === EventSource.CLOSED) {
+                startPolling();
+                setTimeout(connectEvents, 10000);
+            } else {
+                startPolling(); // The browser is reconnecting; poll meanwhile
+            }
+        };
+    }
+
+    function startPolling() {
+        if (!pollTimer) pollTimer = setInterval(fetchGameState, 2000);
+    }
+
+    function stopPolling() {
+        if (pollTimer) { clearInterval(pollTimer); pollTimer = null; }
+    }
+
     function fetchGameState() {
-        fetch('/api/game_state')
-            .then(response => response.ok ? response.json() : Promise.reject('Network response was not ok'))
-            .then(renderGame)
+        // Without a state to diff against, fetch the compact full state plus the static board.
+        const url = currentState ? `${apiBase}/game_state?since=${currentState.version}` : `${apiBase}/game_state?compact=1`;
+        fetch(url)
+            .then(response => {
+                if (response.status === 304) return null; // Nothing changed
+                return response.ok ? response.json() : Promise.reject('Network response was not ok');
+            })
+            .then(update => {
+                if (!update) return null;
+                if (update.boardKey === undefined) return update;
+                return fetchStaticBoard(update.boardKey).then(board => expandCompactState(update, board));
+            })
+            .then(update => { if (update) applyUpdate(update); })
             .catch(error => console.error('Error fetching game state:', error));
     }
 
+    // The static board only changes with a new game, so it is fetched once per board key.
+    let staticBoard = null;
+    function fetchStaticBoard(key) {
+        if (staticBoard && staticBoard.key === key) return Promise.resolve(staticBoard);
+        return fetch(`${apiBase}/board`)
+            .then(response => response.ok ? response.json() : Promise.reject('Could not load the board'))
+            .then(board => { staticBoard = board; return board; });
+    }
+
+    function expandCompactState(compact, board) {
+        const spaces = board.spaces.map(space => ({ ...space }));
+        spaces.forEach(space => { if (space.type === 'PROPERTY') space.owner = null; });
+        compact.owners.forEach(([position, owner]) => { spaces[position].owner = owner; });
+        return {
+            version: compact.version,
+            gameState: compact.gameState,
+            currentPlayerName: compact.currentPlayerName,
+            pendingAction: compact.pendingAction,
+            board: spaces,
+            images: board.images,
+            players: compact.players.map(([name, money, position, isBankrupt, owned]) => ({
+                name, money, position, isBankrupt, properties: owned.map(i => board.spaces[i].name),
+            })),
+            log: compact.log,
+            logStart: compact.logStart,
+        };
+    }
+
     async function handleCommandSubmit(event) {
         event.preventDefault();
         const playerName = playerNameInput.value.trim();
         const message = commandMessageInput.value.trim();
         if (!playerName || !message) { alert('Player Name and Command are required.'); return; }
         try {
-            const response = await fetch('/api/command', {
+            const body = { player: playerName, message: message };
+            if (currentState) body.since = currentState.version;
+            const response = await fetch(`${apiBase}/command`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ player: playerName, message: message }),
+                body: JSON.stringify(body),
             });
-            const newState = await (response.ok ? response.json() : Promise.reject('Command submission failed'));
-            renderGame(newState);
+            const update = await (response.ok ? response.json() : Promise.reject('Command submission failed'));
+            if (update.queued) {
+                // The async server only acknowledges; the result arrives over the event stream.
+                if (pollTimer) setTimeout(fetchGameState, 100);
+            } else {
+                applyUpdate(update);
+            }
             commandMessageInput.value = '';
         } catch (error) { console.error('Error sending command:', error); }
     }
 
+    // The high bits of a version identify the game instance (and server process) that
+    // handed it out; versions of different instances cannot be compared.
+    const epochOf = version => Math.floor(version / 4294967296);
+
+    // Merges a full state or a delta (which carries `since`) into currentState.
+    function applyUpdate(update) {
+        if (update.since === undefined) {
+            currentState = update;
+            renderedLogEnd = -1; // Force a full re-render of the log
+        } else {
+            if (!currentState || epochOf(update.since) !== epochOf(currentState.version)
+                    || update.since > currentState.version) {
+                // We missed changes in between; start over from a full state.
+                currentState = null;
+                fetchGameState();
+                return;
+            }
+            if (update.version <= currentState.version) return; // Stale
+            Object.entries(update.spaces).forEach(([i, space]) => { currentState.board[i] = space; });
+            const players = {};
+            currentState.players.forEach(p => { players[p.name] = p; });
+            update.players.forEach(p => { players[p.name] = p; });
+            currentState.players = update.playerOrder.map(name => players[name]);
+            mergeLog(update);
+            currentState.version = update.version;
+            currentState.gameState = update.gameState;
+            currentState.currentPlayerName = update.currentPlayerName;
+            currentState.pendingAction = update.pendingAction;
+        }
+        renderGame(currentState);
+    }
+
+    // Log entries are addressed by sequence number; logStart is the first one we hold.
+    function mergeLog(update) {
+        const offset = update.logStart - currentState.logStart;
+        if (offset < 0 || offset > currentState.log.length) {
+            currentState.log = update.log.slice();
+            currentState.logStart = update.logStart;
+        } else {
+            currentState.log.splice(offset, currentState.log.length - offset, ...update.log);
+        }
+        const excess = currentState.log.length - MAX_LOG_LINES;
+        if (excess > 0) {
+            currentState.log.splice(0, excess);
+            currentState.logStart += excess;
+        }
+    }
+
     // --- Rendering Functions ---
     function renderGame(state) {
         if (state.board.length !== lastBoardSize) {
-            createBoard(state.board);
+            createBoard(state.board, state.images || {});
             lastBoardSize = state.board.length;
         }
         updateBoard(state.board, state.players);
         renderPlayerList(state.players, state.currentPlayerName);
-        if (JSON.stringify(state.log) !== JSON.stringify(lastLog)) {
-            renderMessageLog(state.log);
-            lastLog = state.log;
-        }
+        renderMessageLog(state.log, state.logStart);
     }
 
     function renderPlayerList(players, currentPlayerName) {
@@ -69,13 +194,20 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
-    function renderMessageLog(log) {
-        messageLog.innerHTML = '';
-        log.forEach(message => {
+    function renderMessageLog(log, logStart) {
+        const logEnd = logStart + log.length;
+        if (renderedLogEnd < logStart || renderedLogEnd > logEnd) {
+            messageLog.innerHTML = '';
+            renderedLogEnd = logStart;
+        }
+        if (renderedLogEnd === logEnd) return;
+        log.slice(renderedLogEnd - logStart).forEach(message => {
             const li = document.createElement('li');
             li.textContent = message;
             messageLog.appendChild(li);
         });
+        renderedLogEnd = logEnd;
+        while (messageLog.children.length > log.length) messageLog.firstChild.remove();
         messageLog.scrollTop = messageLog.scrollHeight;
     }
 
@@ -86,7 +218,7 @@ document.addEventListener('DOMContentLoaded', () => {
         return { row: index - 3 * sideLength + 1, col: 1 }; // Left
     }
 
-    function createBoard(boardData) {
+    function createBoard(boardData, images) {
         gameBoard.innerHTML = '';
         const boardSize = boardData.length;
         if (boardSize === 0) return;
@@ -105,8 +237,9 @@ document.addEventListener('DOMContentLoaded', () => {
             spaceDiv.style.gridRow = `${pos.row} / span 1`;
             spaceDiv.style.gridColumn = `${pos.col} / span 1`;
 
-            if (space.image_url) {
-                spaceDiv.style.backgroundImage = `url('${space.image_url}')`;
+            // Image URLs come once per space type, not with every space
+            if (images[space.type]) {
+                spaceDiv.style.backgroundImage = `url('${images[space.type]}')`;
             }
 
             spaceDiv.innerHTML = `<div class="space-name">${space.name}</div><div class="players-on-space"></div>`;
@@ -1,5 +1,10 @@
 document.addEventListener('DOMContentLoaded', () => {
     const setupForm = document.getElementById('setup-form');
+    const room = new URLSearchParams(window.location.search).get('room');
+    const apiBase = room ? `/api/${encodeURIComponent(room)}` : '/api';
+    const gamePage = room ? `/?room=${encodeURIComponent(room)}` : '/';
+    const backLink = document.querySelector('.back-link');
+    if (backLink) backLink.href = gamePage;
 
     if (setupForm) {
         setupForm.addEventListener('submit', handleSetupSubmit);
@@ -35,12 +40,13 @@ document.addEventListener('DOMContentLoaded', () => {
         const payload = {
             board_size: parseInt(boardSize, 10),
             image_urls: filteredImageUrls,
+            auto_price: formData.get('auto_price') === 'on',
         };
 
         console.log('Sending new game configuration:', payload);
 
         try {
-            const response = await fetch('/api/new_game', {
+            const response = await fetch(`${apiBase}/new_game`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -53,7 +59,7 @@ document.addEventListener('DOMContentLoaded', () => {
             }
 
             // On success, redirect back to the main game page
-            window.location.href = '/';
+            window.location.href = gamePage;
 
         } catch (error) {
             console.error('Error creating new game:', error);
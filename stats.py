@@ -0,0 +1,174 @@
+# monopoly/stats.py
+"""
+Cross-game player statistics and leaderboards in an embedded SQLite database.
+
+Each finished game is written once, in a single transaction: the game row,
+one row per player and the per-player aggregates. Leaderboards read the
+aggregate table through an index and are cached in memory until the next
+game is recorded, by this process or any other one sharing the file, so an
+overlay polling them costs one cheap PRAGMA per request.
+"""
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    room TEXT NOT NULL,
+    seed INTEGER,
+    board_size INTEGER NOT NULL,
+    turns INTEGER NOT NULL,
+    winner TEXT,
+    finished_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS game_players (
+    game_id INTEGER NOT NULL REFERENCES games (id),
+    player TEXT NOT NULL,
+    place INTEGER NOT NULL,
+    won INTEGER NOT NULL,
+    money INTEGER NOT NULL,
+    rent_collected INTEGER NOT NULL,
+    properties INTEGER NOT NULL,
+    PRIMARY KEY (game_id, player)
+);
+CREATE INDEX IF NOT EXISTS game_players_by_player ON game_players (player, game_id DESC);
+CREATE TABLE IF NOT EXISTS player_stats (
+    player TEXT PRIMARY KEY,
+    games INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    rent_collected INTEGER NOT NULL,
+    last_played REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS player_stats_by_wins ON player_stats (wins DESC, games DESC);
+CREATE INDEX IF NOT EXISTS player_stats_by_games ON player_stats (games DESC, wins DESC);
+CREATE INDEX IF NOT EXISTS player_stats_by_rent ON player_stats (rent_collected DESC, wins DESC);
+CREATE TABLE IF NOT EXISTS player_colors (
+    player TEXT NOT NULL,
+    color TEXT NOT NULL,
+    owned INTEGER NOT NULL,
+    PRIMARY KEY (player, color)
+);
+"""
+
+# Leaderboard orderings; each one matches an index on player_stats.
+LEADERBOARD_ORDER = {
+    "wins": "wins DESC, games DESC",
+    "games": "games DESC, wins DESC",
+    "rent": "rent_collected DESC, wins DESC",
+}
+
+
+class StatsStore:
+    def __init__(self, path):
+        self.path = path
+        # Shared by the request threads and the turn scheduler, so access is serialized here.
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._data_version = self._read_data_version()
+
+    def _read_data_version(self):
+        # Changes whenever another connection, e.g. another server process, commits to the file
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _check_cache(self):
+        data_version = self._read_data_version()
+        if data_version != self._data_version:
+            self._data_version = data_version
+            self._cache.clear()
+
+    def record_game(self, room_id, game):
+        """Writes a finished game and folds it into the player aggregates. Returns the game id."""
+        results = game.results()
+        winner = game.players[0].name if len(game.players) == 1 else None
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO games (room, seed, board_size, turns, winner, finished_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (room_id, game.seed, game.board.size, game.turns_played, winner, now),
+            )
+            game_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO game_players (game_id, player, place, won, money, rent_collected, properties)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(game_id, r["name"], place, r["name"] == winner, r["money"], r["rentCollected"], r["properties"])
+                 for place, r in enumerate(results, 1)],
+            )
+            self._conn.executemany(
+                "INSERT INTO player_stats (player, games, wins, rent_collected, last_played) VALUES (?, 1, ?, ?, ?)"
+                " ON CONFLICT (player) DO UPDATE SET games = games + 1, wins = wins + excluded.wins,"
+                " rent_collected = rent_collected + excluded.rent_collected, last_played = excluded.last_played",
+                [(r["name"], int(r["name"] == winner), r["rentCollected"], now) for r in results],
+            )
+            self._conn.executemany(
+                "INSERT INTO player_colors (player, color, owned) VALUES (?, ?, ?)"
+                " ON CONFLICT (player, color) DO UPDATE SET owned = owned + excluded.owned",
+                [(r["name"], color, count) for r in results for color, count in r["colors"].items() if count],
+            )
+            self._cache.clear()
+        return game_id
+
+    def leaderboard(self, by="wins", limit=10):
+        """The top `limit` players ordered by wins, games played or rent collected."""
+        if by not in LEADERBOARD_ORDER:
+            raise ValueError(f"Unknown leaderboard order: {by!r}")
+        key = ("leaderboard", by, limit)
+        with self._lock:
+            self._check_cache()
+            cached = self._cache.get(key)
+            if cached is None:
+                rows = self._conn.execute(
+                    f"SELECT player, games, wins, rent_collected FROM player_stats ORDER BY {LEADERBOARD_ORDER[by]} LIMIT ?",
+                    (limit,),
+                ).fetchall()
+                cached = self._cache[key] = [
+                    {"rank": rank, "player": player, "games": games, "wins": wins, "rentCollected": rent}
+                    for rank, (player, games, wins, rent) in enumerate(rows, 1)
+                ]
+            return cached
+
+    def player_history(self, player_name, limit=20):
+        """A viewer's totals, most-owned colors and most recent games, or None if they never finished one."""
+        key = ("player", player_name, limit)
+        with self._lock:
+            self._check_cache()
+            if key in self._cache:
+                return self._cache[key]
+            if len(self._cache) > 4096:
+                self._cache.clear() # Lookups of many different viewers between two games
+            totals = self._conn.execute(
+                "SELECT games, wins, rent_collected FROM player_stats WHERE player = ?", (player_name,)
+            ).fetchone()
+            history = None
+            if totals is not None:
+                colors = self._conn.execute(
+                    "SELECT color, owned FROM player_colors WHERE player = ? ORDER BY owned DESC LIMIT 3", (player_name,)
+                ).fetchall()
+                recent = self._conn.execute(
+                    "SELECT g.id, g.room, g.finished_at, g.turns, p.place, p.won, p.money, p.rent_collected"
+                    " FROM game_players p JOIN games g ON g.id = p.game_id"
+                    " WHERE p.player = ? ORDER BY p.game_id DESC LIMIT ?",
+                    (player_name, limit),
+                ).fetchall()
+                history = {
+                    "player": player_name,
+                    "games": totals[0],
+                    "wins": totals[1],
+                    "rentCollected": totals[2],
+                    "topColors": [{"color": color, "owned": owned} for color, owned in colors],
+                    "recent": [
+                        {"gameId": game_id, "room": room, "finishedAt": finished_at, "turns": turns, "place": place,
+                         "won": bool(won), "money": money, "rentCollected": rent}
+                        for game_id, room, finished_at, turns, place, won, money, rent in recent
+                    ],
+                }
+            self._cache[key] = history
+            return history
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
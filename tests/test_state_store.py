@@ -0,0 +1,63 @@
+# monopoly/tests/test_state_store.py
+"""Run from the project directory: python -m unittest discover tests"""
+import itertools
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import game
+from config import SETTINGS
+from rooms import RoomRegistry
+
+
+class SharedVersionsTest(unittest.TestCase):
+    """Two registries on one SQLite store stand in for two server processes."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        config = dict(SETTINGS, STATE_STORE=os.path.join(self.tmp.name, "state.db"), TURN_TIMEOUT_SECONDS=0)
+        self.worker_a = RoomRegistry(config)
+        self.worker_b = RoomRegistry(config)
+        self.versions = game._state_versions
+
+    def tearDown(self):
+        game._state_versions = self.versions
+        self.worker_a.close_all()
+        self.worker_b.close_all()
+        self.tmp.cleanup()
+
+    def test_since_from_another_process_gets_full_state(self):
+        room_a = self.worker_a.get("room")
+        room_a.run_command("join", "a")
+        room_a.run_command("join", "b")
+        client_version = room_a.game.version
+        room_a.run_command("join", "c")
+
+        # A new process counts versions from the start again, so its range can
+        # cover the version the client got from process A.
+        game._state_versions = itertools.count(client_version % 2 ** 32 - 1)
+        room_b = self.worker_b.get("room")
+        room_b.run_command("status", "a")
+
+        state = room_b.game.get_state(since=client_version)
+        self.assertNotIn("since", state)
+        self.assertEqual([p["name"] for p in state["players"]], ["a", "b", "c"])
+        self.assertEqual(room_b.state_body(since=client_version), room_b.state_body())
+
+    def test_delta_within_one_process(self):
+        room_a = self.worker_a.get("room")
+        room_a.run_command("join", "a")
+        client_version = room_a.game.version
+        room_a.run_command("join", "b")
+
+        delta = room_a.game.get_state(since=client_version)
+        self.assertEqual(delta["since"], client_version)
+        self.assertEqual([p["name"] for p in delta["players"]], ["b"])
+        self.assertEqual(delta["playerOrder"], ["a", "b"])
+
+
+if __name__ == '__main__':
+    unittest.main()
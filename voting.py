@@ -0,0 +1,95 @@
+# monopoly/voting.py
+import threading
+import time
+
+from command_parser import parse_command
+
+# Commands the crowd can vote for, by the move the game is waiting for. On a
+# tie the earlier option wins, so an undecided crowd passes rather than buys.
+VOTE_OPTIONS = {
+    "roll": ("roll",),
+    "buy_or_pass": ("pass", "buy"),
+}
+
+
+class CrowdVote:
+    """
+    Lets viewers who are not playing vote on the move the game is waiting for.
+
+    The first vote for a move opens a window of `window_seconds`; when it
+    closes, the most voted command is run once, as the player whose move it
+    is. A vote costs a parse and a few dict operations. Each viewer counts once
+    per window: viewers are stamped with the window number they last voted
+    in, so opening a new window resets everyone by bumping one integer.
+    """
+    def __init__(self, room, window_seconds=10, min_votes=1, max_voters=100000):
+        self.room = room
+        self.window_seconds = window_seconds
+        self.min_votes = min_votes
+        self.max_voters = max_voters
+        self.window = 0
+        self.turn_key = None # The move the open window decides, None if no window is open
+        self.counts = {}
+        self.closes_at = None
+        self._voted_in = {} # viewer -> number of the last window they voted in
+        self._lock = threading.Lock()
+
+    def vote(self, viewer, message):
+        """Counts `message` as `viewer`'s vote. Returns True if it was counted."""
+        game = self.room.game
+        if game.game_state != "IN_PROGRESS" or viewer in game.player_map:
+            return False
+        command_data = parse_command(message, viewer, "IN_PROGRESS")
+        if command_data is None:
+            return False
+        with self._lock:
+            turn_key = game.turn_key()
+            command = command_data["command"]
+            # Only a vote for the move being waited on may open a window; !status must not start the clock
+            if turn_key is None or command not in VOTE_OPTIONS[turn_key[3]]:
+                return False
+            if turn_key != self.turn_key:
+                self._open_window(turn_key)
+            counts = self.counts
+            if self._voted_in.get(viewer) == self.window:
+                return False
+            self._voted_in[viewer] = self.window
+            counts[command] += 1
+            return True
+
+    def _open_window(self, turn_key):
+        self.window += 1
+        self.turn_key = turn_key
+        self.counts = dict.fromkeys(VOTE_OPTIONS[turn_key[3]], 0)
+        self.closes_at = time.monotonic() + self.window_seconds
+        if len(self._voted_in) > self.max_voters:
+            self._voted_in = {} # Everyone in it is from an earlier window anyway
+        self.room.schedule_vote(turn_key, self.window_seconds)
+
+    def close(self, turn_key):
+        """
+        Ends the window for `turn_key` and returns (command, counts), or None
+        if that window is no longer open or did not get enough votes.
+        """
+        with self._lock:
+            if turn_key != self.turn_key:
+                return None
+            counts = self.counts
+            self.turn_key = None
+            self.counts = {}
+            self.closes_at = None
+        total = sum(counts.values())
+        if total < self.min_votes:
+            return None
+        return max(counts, key=counts.get), counts
+
+    def tally(self):
+        with self._lock:
+            if self.turn_key is None:
+                return {"open": False}
+            return {
+                "open": True,
+                "player": self.turn_key[2],
+                "counts": dict(self.counts),
+                "closesIn": round(max(self.closes_at - time.monotonic(), 0.0), 2),
+            }